@@ -0,0 +1,82 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Microbenchmark of Entity component lookups.
+
+Usage: python benchmarks/component_lookup.py
+
+Print the cost of get_component and has_component calls on entities
+carrying 5, 10 and 20 components. The looked-up component is the last
+one added, which was the worst case of the former list-based storage.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'family_treasure')
+)
+
+from ecs import World
+
+NUMBER = 200000
+REPEAT = 5
+
+
+def make_component_classes(count):
+    """Return count distinct component classes.
+    """
+    return [type('Component%d' % i, (object,), {}) for i in range(count)]
+
+
+def time_calls(method, arg):
+    """Return the best per-call cost of method(arg), in nanoseconds.
+    """
+    best = None
+    for _ in range(REPEAT):
+        start = time.time()
+        for _ in xrange(NUMBER):
+            method(arg)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / NUMBER * 1e9
+
+
+def bench(component_count):
+    classes = make_component_classes(component_count)
+    world = World()
+    entity = world.entity()
+    entity.add_components(*[cls() for cls in classes])
+    last_class = classes[-1]
+
+    return (
+        time_calls(entity.get_component, last_class),
+        time_calls(entity.has_component, last_class)
+    )
+
+
+def main():
+    print "%12s %20s %20s" % ("components", "get_component (ns)", "has_component (ns)")
+    for count in (5, 10, 20):
+        get_cost, has_cost = bench(count)
+        print "%12d %20.1f %20.1f" % (count, get_cost, has_cost)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Benchmark of the culling of GraphicsSystem.
+
+Usage: python benchmarks/culling.py
+
+Print the cost of drawing a frame of a 4000x3000 building of 50x50
+tiles drawn by render functions, on an 800x600 screen. The building is
+drawn whole, then with a tile space clip limited to a 600x500 room.
+Nothing is static, so every visible entity is drawn each frame.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'family_treasure')
+)
+
+import pygame
+
+from ecs import World
+from geometry import Positionable
+from graphics import OffscreenScreen, GraphicsSystem, Renderable
+from tile import TileSpace, TilePositionable, TileSystem
+
+REPEAT = 10
+
+BUILDING_SIZE = (80, 60)
+
+
+def draw_tile(brush):
+    brush.draw_rect((90, 60, 30), (0, 0), (48, 48))
+
+
+def create_systems(clip, dirty_rects):
+    world = World()
+    world.entity().add_components(
+        Positionable(0, 0, 0, 0),
+        TileSpace("ground", (50, 50), clip)
+    )
+
+    for i in xrange(BUILDING_SIZE[0] * BUILDING_SIZE[1]):
+        world.entity().add_components(
+            Positionable(0, 0, 50, 50),
+            Renderable(draw_tile, 0),
+            TilePositionable(
+                "ground",
+                (i % BUILDING_SIZE[0], i / BUILDING_SIZE[0] + 1),
+                0
+            )
+        )
+
+    tile_system = TileSystem(world, 5)
+    tile_system.update_tile_positions()
+    screen = OffscreenScreen((800, 600))
+    return GraphicsSystem(world, screen, dirty_rects)
+
+
+def time_draw(clip, dirty_rects):
+    """Return the best time of a frame, in milliseconds.
+    """
+    graphics_system = create_systems(clip, dirty_rects)
+    graphics_system.draw_entities()
+
+    best = None
+    for _ in range(REPEAT):
+        start = time.time()
+        graphics_system.draw_entities()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000
+
+
+def main():
+    pygame.display.init()
+    print "%12s %14s %14s" % ("clip", "default (ms)", "dirty (ms)")
+    for clip in (None, (0, 0, 600, 500)):
+        print "%12s %14.2f %14.2f" % (
+            "room" if clip else "none",
+            time_draw(clip, False),
+            time_draw(clip, True)
+        )
+
+
+if __name__ == "__main__":
+    main()
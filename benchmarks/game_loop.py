@@ -0,0 +1,82 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Benchmark of the whole game loop, without a display.
+
+Usage: python benchmarks/game_loop.py [frames] [--dirty] [--half]
+
+Start a game from the title screen and play the given number of
+frames (3000 by default) as fast as possible in an OffscreenScreen,
+drawn at 400x300 with --half. Print the frame rate and the average
+time of each system.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'family_treasure')
+)
+
+import pygame
+
+from game import Game
+
+# Position of the "Start" text of the title screen
+START_POSITION = (400, 320)
+
+
+def main():
+    arguments = [a for a in sys.argv[1:] if not a.startswith("--")]
+    frames = int(arguments[0]) if arguments else 3000
+
+    # Click on "Start" as soon as the loop begins.
+    pygame.init()
+    pygame.event.post(pygame.event.Event(
+        pygame.MOUSEBUTTONDOWN,
+        pos=START_POSITION,
+        button=1
+    ))
+
+    game = Game(
+        60,
+        (800, 600),
+        dirty_rects="--dirty" in sys.argv,
+        resolution=(400, 300) if "--half" in sys.argv else None,
+        headless=True,
+        frames=frames
+    )
+    start = time.time()
+    game.run()
+    elapsed = time.time() - start
+
+    print "%d frames in %.2f s: %.1f frames/s" % (
+        game.frame_count,
+        elapsed,
+        game.frame_count / elapsed
+    )
+    timings = game.pipeline.get_average_timings()
+    for name in sorted(timings):
+        print "%12s %8.3f ms" % (name, timings[name] * 1000)
+
+
+if __name__ == "__main__":
+    main()
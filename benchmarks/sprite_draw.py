@@ -0,0 +1,102 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Benchmark of GraphicsSystem drawing sprites.
+
+Usage: python benchmarks/sprite_draw.py
+
+Print the cost of drawing 100, 1000 and 5000 small images, with a
+render function per entity and with Sprite components, in the default
+mode and in dirty rectangles mode. Nothing is static, so every entity
+is drawn each frame.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'family_treasure')
+)
+
+import pygame
+
+from ecs import World
+from geometry import Positionable
+from graphics import OffscreenScreen, GraphicsSystem, Renderable, Sprite
+
+REPEAT = 10
+
+
+def create_system(entity_count, sprites, dirty_rects):
+    world = World()
+    screen = OffscreenScreen((800, 600))
+    graphics_system = GraphicsSystem(world, screen, dirty_rects)
+    graphics_system.sprite_dict["tile"] = pygame.Surface(
+        (8, 8),
+        pygame.SRCALPHA
+    )
+
+    for i in xrange(entity_count):
+        e = world.entity()
+        e.add_components(Positionable((i * 8) % 800, (i / 100) % 600, 8, 8))
+        if sprites:
+            e.add_components(Renderable(None, i % 10), Sprite("tile"))
+        else:
+            e.add_component(Renderable(
+                lambda brush: brush.draw_image("tile"),
+                i % 10
+            ))
+
+    return graphics_system
+
+
+def time_draw(entity_count, sprites, dirty_rects):
+    """Return the best time of a frame, in milliseconds.
+    """
+    graphics_system = create_system(entity_count, sprites, dirty_rects)
+    graphics_system.draw_entities()
+
+    best = None
+    for _ in range(REPEAT):
+        start = time.time()
+        graphics_system.draw_entities()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000
+
+
+def main():
+    pygame.display.init()
+    print "%10s %14s %14s %14s %14s" % (
+        "entities", "func (ms)", "sprite (ms)", "func dirty", "sprite dirty"
+    )
+    for count in (100, 1000, 5000):
+        print "%10d %14.2f %14.2f %14.2f %14.2f" % (
+            count,
+            time_draw(count, False, False),
+            time_draw(count, True, False),
+            time_draw(count, False, True),
+            time_draw(count, True, True)
+        )
+
+
+if __name__ == "__main__":
+    main()
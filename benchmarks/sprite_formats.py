@@ -0,0 +1,109 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Benchmark of the pixel formats of the sprites.
+
+Usage: python benchmarks/sprite_formats.py
+
+Load every image of the data directory, and print the pixel format
+chosen for it with its memory and blit time, compared with
+convert_alpha. The memory of a color keyed sprite is the memory of
+its pixels before they are run-length encoded, which pygame does not
+report.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'family_treasure')
+)
+
+import pygame
+
+import data
+from graphics import OffscreenScreen, get_pixel_format, convert_sprite
+
+BLITS = 200
+REPEAT = 5
+
+
+def get_memory(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+def time_blits(screen, surface):
+    """Return the best time of a blit of surface, in microseconds.
+    """
+    blit_sequence = [(surface, (0, 0))] * BLITS
+    best = None
+    for _ in range(REPEAT):
+        start = time.time()
+        screen.blits(blit_sequence, 0)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000000 / BLITS
+
+
+def main():
+    pygame.display.init()
+    screen = OffscreenScreen((800, 600)).pygame_screen
+
+    print "%-28s %9s %10s %10s %10s %10s" % (
+        "image", "format", "alpha (B)", "format (B)", "alpha (us)",
+        "format (us)"
+    )
+    totals = {}
+    for filename in sorted(os.listdir(data.data_dir)):
+        if not filename.endswith(".png"):
+            continue
+        image = pygame.image.load(data.filepath(filename))
+        pixel_format = get_pixel_format(image)
+        alpha = image.convert_alpha()
+        converted = convert_sprite(image, pixel_format)
+
+        row = (
+            get_memory(alpha),
+            get_memory(converted),
+            time_blits(screen, alpha),
+            time_blits(screen, converted)
+        )
+        print "%-28s %9s %10d %10d %10.1f %10.1f" % (
+            (filename, pixel_format) + row
+        )
+        total = totals.setdefault(pixel_format, [0, 0, 0, 0, 0])
+        total[0] += 1
+        for i, value in enumerate(row):
+            total[i + 1] += value
+
+    print
+    print "%-9s %7s %10s %10s %10s %10s" % (
+        "format", "images", "alpha (B)", "format (B)", "alpha (us)",
+        "format (us)"
+    )
+    for pixel_format, total in sorted(totals.iteritems()):
+        print "%-9s %7d %10d %10d %10.1f %10.1f" % (
+            (pixel_format,) + tuple(total)
+        )
+
+
+if __name__ == "__main__":
+    main()
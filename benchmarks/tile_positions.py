@@ -0,0 +1,88 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+"""Benchmark of TileSystem.update_tile_positions.
+
+Usage: python benchmarks/tile_positions.py
+
+Print the cost of one tile update pass over 1000, 10000 and 50000 tile
+entities, with the per-entity and the columnar implementations.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'family_treasure')
+)
+
+from ecs import World
+from geometry import Positionable
+from graphics import Renderable
+from tile import TileSpace, TilePositionable, TileSystem
+import columns
+
+REPEAT = 10
+
+
+def create_world(entity_count):
+    world = World()
+    world.entity().add_components(
+        Positionable(100, 100, 500, 400),
+        TileSpace("ground", (50, 50))
+    )
+
+    for i in xrange(entity_count):
+        world.entity().add_components(
+            Positionable(0, 0, 50, 50),
+            Renderable(lambda brush: None, 0),
+            TilePositionable("ground", (i % 100, i / 100), 0)
+        )
+
+    return world
+
+
+def time_update(entity_count, columnar):
+    """Return the best time of a tile update pass, in milliseconds.
+    """
+    tile_system = TileSystem(create_world(entity_count), 5, columnar)
+    tile_system.update_tile_positions()
+
+    best = None
+    for _ in range(REPEAT):
+        start = time.time()
+        tile_system.update_tile_positions()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1000
+
+
+def main():
+    print "%10s %18s %18s" % ("entities", "per-entity (ms)", "columnar (ms)")
+    for count in (1000, 10000, 50000):
+        columnar_cost = time_update(count, True) if columns.available else None
+        print "%10d %18.2f %18s" % (
+            count,
+            time_update(count, False),
+            "%.2f" % columnar_cost if columnar_cost is not None else "n/a"
+        )
+
+
+if __name__ == "__main__":
+    main()
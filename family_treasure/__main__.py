@@ -1,5 +1,54 @@
+import argparse
+
 import game
 
+def size(text):
+    """Parse a WIDTHxHEIGHT command line argument.
+    """
+    try:
+        width, height = text.lower().split("x")
+        return (int(width), int(height))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected WIDTHxHEIGHT, e.g. 800x600")
+
 def main():
-    app = game.Game(60,(800,600))
+    parser = argparse.ArgumentParser(description="The Family's Treasure Tale")
+    parser.add_argument(
+        "--record",
+        metavar="DIRECTORY",
+        help="write every frame in DIRECTORY, as PNG files"
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="with --record, write raw RGB frames in a single file"
+    )
+    parser.add_argument(
+        "--window",
+        type=size,
+        default=(800, 600),
+        metavar="WIDTHxHEIGHT",
+        help="size of the window, 800x600 by default"
+    )
+    parser.add_argument(
+        "--resolution",
+        type=size,
+        metavar="WIDTHxHEIGHT",
+        help="resolution the game is drawn at, the window size by default"
+    )
+    parser.add_argument(
+        "--smooth",
+        action="store_true",
+        help="scale the frames to the window smoothly"
+    )
+    arguments = parser.parse_args()
+
+    app = game.Game(
+        60,
+        arguments.window,
+        record=arguments.record,
+        record_raw=arguments.raw,
+        resolution=arguments.resolution,
+        smooth_scaling=arguments.smooth
+    )
     app.run()
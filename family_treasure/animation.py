@@ -17,7 +17,7 @@
 from random import random
 
 from tile import TilePositionable
-from graphics import Renderable, Colorable
+from graphics import Renderable, Sprite, Colorable
 from ecs import Activable
 from light import Lightable
 from fear import Frightening
@@ -106,9 +106,13 @@ class SpriteAnimation:
             update_renderable = True
 
         if update_renderable:
-            renderable = entity.get_component(Renderable)
-            renderable.render_func = lambda brush: brush.draw_image(
-                self.sprite_list[self.current_sprite])
+            sprite = entity.get_component(Sprite)
+            if sprite is not None:
+                sprite.key = self.sprite_list[self.current_sprite]
+            else:
+                renderable = entity.get_component(Renderable)
+                renderable.render_func = lambda brush: brush.draw_image(
+                    self.sprite_list[self.current_sprite])
 
         return self.remaining_duration > 1e-6
 
@@ -215,18 +219,33 @@ class Animable:
 class AnimationSystem:
     """System in charge of running animations.
     """
+
+    # Component classes accessed by the system, see pipeline.SystemPipeline
+    reads = (Animable, TilePositionable, Colorable, Frightening)
+    writes = (
+        Animable,
+        TilePositionable,
+        Renderable,
+        Sprite,
+        Colorable,
+        Activable,
+        Lightable,
+        Frightening
+    )
+
     def __init__(self, world):
         self.world = world
+        self.animables = world.query(Animable)
 
     def update(self, time_elapsed):
         """Update entities' animations.
 
         time_elapsed is the time to run the animation step, in seconds.
         """
-        for entity in self.world.get_entities([Animable]):
+        for entity in self.animables:
             animable = entity.get_component(Animable)
-            animations = animable.animations[:]
-
-            for animation in animations:
-                if not animation.update(entity, time_elapsed):
-                    animable.remove_animation(animation)
+            if animable.animations:
+                animable.animations = [
+                    animation for animation in animable.animations
+                    if animation.update(entity, time_elapsed)
+                ]
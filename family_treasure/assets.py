@@ -1,14 +1,98 @@
-from graphics import GraphicsSystem
+import hashlib
+import os
+
+import pygame
+
+import data
+from atlas import load_atlas, pack_sprites
+from graphics import get_scaled_surface
 
 charsets = {"boy.png": (30,60),"burglar.png": (30,60), "girl.png": (30,60), "boy_chest.png": (40,60), "burglar_lantern.png": (30,60)}
 
 orientations = ["wall_tile.png", "door2.png", "window.png", "window_open.png", "window_semiopen.png"]
 
+# Images of the data directory which are not sprites
+not_sprites = ["ftt_icon.png"]
+
+# Directory where the atlas of the sprites is cached
+cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "family_treasure")
+
 def load_assets(graphics_system):
-    """ Utility function to load graphics assets"""
+    """ Utility function to load graphics assets
+
+    All the sprites are packed in an atlas, which is cached on disk
+    and only built again when the images change. The atlases of the
+    older images are then removed.
+    """
+    path = os.path.join(cache_dir, "atlas-" + get_assets_key())
+    atlas = load_atlas(path)
+
+    if atlas is None:
+        atlas = build_atlas(graphics_system)
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            atlas.save(path)
+            remove_stale_atlases(os.path.basename(path))
+        except (IOError, OSError, pygame.error):
+            pass
+
+    graphics_system.sprite_dict.update(atlas.get_sprites())
+
+    # Sprites are scaled to the resolution of the screen once, before
+    # the first frame.
+    screen = graphics_system.screen
+    if screen.scaled:
+        for surface in graphics_system.sprite_dict.itervalues():
+            get_scaled_surface(surface, screen.scale)
+
+def remove_stale_atlases(name):
+    """ Remove the files of the atlases cached for older images, all
+    but the ones of the atlas called name"""
+    for filename in os.listdir(cache_dir):
+        if filename.startswith("atlas-") and not (
+                filename == name + ".json" or
+                filename.startswith(name + "-")):
+            os.remove(os.path.join(cache_dir, filename))
+
+def build_atlas(graphics_system):
+    """ Load all the sprites in the sprite dictionary of the graphics
+    system, and return them packed in an atlas"""
     for c in charsets:
         graphics_system.load_charset(c, charsets[c])
 
     for o in orientations:
         graphics_system.load_four_orientations(o)
-        
+
+    # The top orientation is the image itself, and charsets are only
+    # drawn through their rows.
+    sprite_dict = graphics_system.sprite_dict
+    for o in orientations:
+        partition = o.partition('.')
+        sprite_dict[o] = sprite_dict[partition[0] + "_t" + partition[1] +
+                                     partition[2]]
+
+    # The images are packed as they are loaded, not converted to the
+    # display format, as the atlas is reused with other displays.
+    for filename in get_sprite_files():
+        if filename not in charsets and filename not in sprite_dict:
+            sprite_dict[filename] = pygame.image.load(data.filepath(filename))
+
+    return pack_sprites(sprite_dict)
+
+def get_sprite_files():
+    return sorted(
+        f for f in os.listdir(data.data_dir)
+        if f.endswith(".png") and f not in not_sprites
+    )
+
+def get_assets_key():
+    """ Return a key identifying the current images and the way they
+    are cut into sprites"""
+    files = []
+    for filename in get_sprite_files():
+        stat = os.stat(data.filepath(filename))
+        files.append((filename, stat.st_size, int(stat.st_mtime)))
+
+    description = repr((files, sorted(charsets.items()), orientations))
+    return hashlib.md5(description).hexdigest()
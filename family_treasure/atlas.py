@@ -0,0 +1,195 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+import json
+
+import pygame
+
+from graphics import OPAQUE, COLORKEY, ALPHA, get_pixel_format, convert_sprite
+
+# Order of the pages of each pixel format
+PIXEL_FORMATS = (OPAQUE, COLORKEY, ALPHA)
+
+
+class Atlas(object):
+    """Sprites packed in a few large surfaces, the pages.
+
+    index maps each sprite name to its (page number, pygame.Rect).
+    formats gives the pixel format of the sprites of each page, see
+    graphics.get_pixel_format.
+    """
+
+    def __init__(self, pages, index, formats):
+        self.pages = pages
+        self.index = index
+        self.formats = formats
+
+    def get_sprites(self):
+        """Return a dictionary of the sprites indexed by name.
+
+        The pages hold the sprites as they were loaded, and are only
+        converted to the display format here, since they are cached on
+        disk. Each sprite is a subsurface of its converted page, so
+        blitting it blits from the page region. Color keyed sprites are
+        copied out of their page instead, as only a whole surface can
+        be run-length encoded.
+        """
+        pages = []
+        for page, pixel_format in zip(self.pages, self.formats):
+            if pixel_format == OPAQUE:
+                pages.append(convert_sprite(page, OPAQUE))
+            else:
+                pages.append(page.convert_alpha())
+
+        sprites = {}
+        keyed = {}
+        for name, (page, rect) in self.index.iteritems():
+            surface = pages[page].subsurface(rect)
+            if self.formats[page] == COLORKEY:
+                key = (page, tuple(rect))
+                if key not in keyed:
+                    keyed[key] = convert_sprite(surface, COLORKEY)
+                surface = keyed[key]
+            sprites[name] = surface
+        return sprites
+
+    def save(self, path):
+        """Save the atlas as the files path.json and path-<page>.tga, a
+        losslessly compressed format faster to load than PNG.
+        """
+        for i, page in enumerate(self.pages):
+            pygame.image.save(page, "%s-%d.tga" % (path, i))
+
+        with open(path + ".json", "w") as f:
+            json.dump(
+                {
+                    "pages": len(self.pages),
+                    "formats": self.formats,
+                    "index": dict(
+                        (name, (page, list(rect)))
+                        for name, (page, rect) in self.index.iteritems()
+                    )
+                },
+                f
+            )
+
+
+def load_atlas(path):
+    """Load an atlas saved with Atlas.save, and return it, or None if
+    its files cannot be read.
+    """
+    try:
+        with open(path + ".json") as f:
+            saved = json.load(f)
+        formats = [str(f) for f in saved["formats"]]
+        pages = [
+            pygame.image.load("%s-%d.tga" % (path, i))
+            for i in range(len(formats))
+        ]
+    except (IOError, OSError, ValueError, KeyError, pygame.error):
+        return None
+
+    index = dict(
+        (str(name), (page, pygame.Rect(rect)))
+        for name, (page, rect) in saved["index"].iteritems()
+    )
+    return Atlas(pages, index, formats)
+
+
+def pack_sprites(sprites, page_size=(1024, 1024)):
+    """Pack sprites, a dictionary of surfaces indexed by name, in an
+    Atlas and return it.
+
+    A surface is packed once even if it has several names, and a
+    subsurface is packed as a part of its parent surface. The surfaces
+    are sorted by pixel format, so that each page only holds one
+    format. They are placed on shelves, the highest first, and a new
+    page is started when a page is full or the format changes. Pages
+    are only as large as their surfaces need.
+    """
+    page_width, page_height = page_size
+    surfaces = {}
+    for surface in sprites.itervalues():
+        root = surface.get_abs_parent()
+        surfaces[id(root)] = root
+
+    # The roots with per-pixel alpha tell the pixel format, and are
+    # the ones copied in the pages.
+    alpha_roots = {}
+    root_formats = {}
+    for key, root in surfaces.iteritems():
+        if not root.get_flags() & pygame.SRCALPHA:
+            root = root.convert_alpha()
+        alpha_roots[key] = root
+        root_formats[key] = get_pixel_format(root)
+
+    keys = sorted(
+        surfaces,
+        key=lambda k: (
+            PIXEL_FORMATS.index(root_formats[k]),
+            -surfaces[k].get_height(),
+            -surfaces[k].get_width()
+        )
+    )
+
+    placements = []
+    formats = []
+    x = y = shelf_height = 0
+    for key in keys:
+        w, h = surfaces[key].get_size()
+
+        if x + w > page_width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+
+        if (not placements or formats[-1] != root_formats[key]
+                or y + h > page_height):
+            placements.append([])
+            formats.append(root_formats[key])
+            x = y = shelf_height = 0
+
+        placements[-1].append((key, pygame.Rect(x, y, w, h)))
+        x += w
+        shelf_height = max(shelf_height, h)
+
+    pages = []
+    root_places = {}
+    for page_placements in placements:
+        rects = [rect for key, rect in page_placements]
+        size = rects[0].unionall(rects[1:]).size
+        page = pygame.Surface(size, pygame.SRCALPHA, 32).convert_alpha()
+        page.fill((0, 0, 0, 0))
+
+        for key, rect in page_placements:
+            # The page is transparent black, so a maximum blend copies
+            # the pixels exactly, alpha included, where a normal blit
+            # would blend them.
+            page.blit(alpha_roots[key], rect, None, pygame.BLEND_RGBA_MAX)
+            root_places[key] = (len(pages), rect)
+
+        pages.append(page)
+
+    index = {}
+    for name, surface in sprites.iteritems():
+        page, rect = root_places[id(surface.get_abs_parent())]
+        x, y = surface.get_abs_offset()
+        index[name] = (
+            page,
+            pygame.Rect(rect.x + x, rect.y + y, *surface.get_size())
+        )
+
+    return Atlas(pages, index, formats)
@@ -14,8 +14,6 @@
 # along with The Family's treasure tale.  If not, see
 # <http://www.gnu.org/licenses/>.
 
-from ecs import Activable
-
 class MiniMapRenderable:
 
     """Component for entities that can be rendered on the minimap.
@@ -60,5 +58,4 @@ class Building:
 def toggle_room(world, room):
     """Toggle activation of all the activated entities of the room.
     """
-    for entity in room.activated_entities:
-        entity.get_component(Activable).toggle()
+    world.toggle_activation(room.activated_entities)
@@ -13,7 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with The Family's treasure tale.  If not, see
 # <http://www.gnu.org/licenses/>.
-from graphics import Renderable
+from graphics import Renderable, Sprite
 from animation import TileMoveAnimation, SpriteAnimation, Animable
 from tile import TilePositionable
 from geometry import Positionable
@@ -41,9 +41,7 @@ class Character(object):
     def set_idle_image(self):
         """Update the renderable to draw idle image.
         """
-        idle_image = self.animation_list[0]
-        renderable = self.entity.get_component(Renderable)
-        renderable.render_func = lambda brush: brush.draw_image(idle_image)
+        self.entity.get_component(Sprite).key = self.animation_list[0]
 
     @property
     def direction(self):
@@ -105,7 +103,8 @@ def create_character(world, base_pos, animation_name, base_direction, fps):
     character = world.entity()
     character.add_components(
         Positionable(0, 0, 40, 80),
-        Renderable(lambda brush: None, 2),
+        Renderable(None, 2),
+        Sprite(None),
         TilePositionable("ground", base_pos, 2),
         Animable(),
         Activable()
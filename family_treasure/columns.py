@@ -0,0 +1,92 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# True when the columnar storage can be used.
+available = numpy is not None
+
+
+class ColumnStore(object):
+    """Struct-of-arrays storage for numeric component fields.
+
+    Each field is a NumPy array, and a component bound to the store
+    owns a slot, i.e. an index in all the arrays. Systems can then
+    update the fields of all bound components in one vectorized pass,
+    while the components keep exposing them as properties.
+
+    Slots of freed components are recycled. Arrays are replaced when
+    they grow, so references to them must not be kept across
+    allocations.
+    """
+
+    def __init__(self, fields, capacity=256):
+        """Initialization
+
+        fields: a list of (name, dtype) pairs
+        capacity: the initial number of slots
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.free_slots = []
+        self.columns = {}
+        for name, dtype in fields:
+            self.columns[name] = numpy.zeros(capacity, dtype)
+
+    def allocate(self):
+        """Return a free slot.
+        """
+        if self.free_slots:
+            return self.free_slots.pop()
+
+        if self.size == self.capacity:
+            self.grow()
+
+        slot = self.size
+        self.size += 1
+        return slot
+
+    def free(self, slot):
+        """Give a slot back to the store.
+        """
+        self.free_slots.append(slot)
+
+    def grow(self):
+        """Double the capacity of all the arrays.
+        """
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown = numpy.zeros(self.capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def get(self, name, slot):
+        """Return the value of a field as a python number.
+        """
+        return self.columns[name][slot].item()
+
+    def set(self, name, slot, value):
+        self.columns[name][slot] = value
+
+    def view(self, name):
+        """Return the part of a field array that holds allocated slots.
+
+        Freed slots are included, and hold outdated data.
+        """
+        return self.columns[name][:self.size]
@@ -1,4 +1,59 @@
 #-*- encoding:utf-8 -*-
+from itertools import count
+
+
+# Number of low bits of an entity handle holding its slot index. The
+# remaining high bits hold the generation of the slot.
+INDEX_BITS = 24
+INDEX_MASK = (1 << INDEX_BITS) - 1
+
+# Source of change stamps, see mark_changed. Drawing from it is atomic,
+# so systems running in parallel threads can stamp components.
+change_stamps = count(1)
+
+
+def mark_changed(component):
+    """Stamp a component as changed.
+
+    Stamps are increasing, so a system that remembers current_change()
+    when it runs can later find the components changed since then.
+    """
+    component.changed = next(change_stamps)
+
+
+def current_change():
+    """Return a stamp greater than the ones of all the previous changes,
+    and lower than the ones of all the following changes.
+    """
+    return next(change_stamps)
+
+
+# Bits of the component classes, see component_bit.
+component_bits = {}
+
+
+def component_bit(component_class):
+    """Return the signature bit of a component class.
+
+    Classes are registered the first time they are used, and each one
+    gets its own bit.
+    """
+    bit = component_bits.get(component_class)
+
+    if bit is None:
+        bit = 1 << len(component_bits)
+        component_bits[component_class] = bit
+
+    return bit
+
+
+def component_mask(component_classes):
+    """Return the signature mask of several component classes.
+    """
+    mask = 0
+    for cls in component_classes:
+        mask |= component_bit(cls)
+    return mask
 
 
 class ComponentAlreadyExistsError(Exception):
@@ -6,16 +61,32 @@ class ComponentAlreadyExistsError(Exception):
     """
 
 
+class StaleEntityError(Exception):
+    """Raised when using an entity that has been removed from its world.
+    """
+
+
 class Entity(object):
     """Represent an entity.
 
     In true Entity-Component-Systems, an entity is simply an id. Here,
     an entity is a collection of components because the ratio
-    convenience / performance is quite low for this game.
+    convenience / performance is quite low for this game. The world
+    still gives each entity an integer handle, see World.
+
+    Components are kept in insertion order in the components list, and
+    indexed by class in component_map for constant-time lookups.
     """
 
-    def __init__(self):
+    def __init__(self, world=None):
         self.components = []
+        self.component_map = {}
+        self.signature = 0
+        self.world = world
+        self.archetype = None
+        self.serial = 0
+        self.handle = None
+        self.dense_index = None
 
     def add_component(self, component):
         """Add a new component to the entity.
@@ -36,21 +107,133 @@ class Entity(object):
         Success
 
         """
-        if self.has_component(component.__class__):
+        if component.__class__ in self.component_map:
             raise ComponentAlreadyExistsError()
 
         self.components.append(component)
+        self.component_map[component.__class__] = component
+        self.signature |= component_bit(component.__class__)
+        self.attach(component)
+        self.notify_structure_change()
 
     def add_components(self, *components):
         """Add several components to the entity.
 
-        This is a convenience method.
+        This is a convenience method. As with add_component, a
+        ComponentAlreadyExistsError is raised if one of the components
+        already exists, and none of them is added in this case.
+
+        >>> e = Entity()
+        >>> class C:
+        ...     pass
+        ...
+        >>> class D:
+        ...     pass
+        ...
+        >>> e.add_component(C())
+        >>> try:
+        ...     e.add_components(D(), C())
+        ... except ComponentAlreadyExistsError:
+        ...     print "Success"
+        ...
+        Success
+        >>> e.has_component(D)
+        False
         """
+        classes = set(self.component_map)
+        for c in components:
+            if c.__class__ in classes:
+                raise ComponentAlreadyExistsError()
+            classes.add(c.__class__)
+
         for c in components:
             self.components.append(c)
+            self.component_map[c.__class__] = c
+            self.signature |= component_bit(c.__class__)
+            self.attach(c)
+        self.notify_structure_change()
+
+    def add_tag(self, tag_class):
+        """Mark the entity with a tag class.
+
+        A tag is a component without data: it only sets the bit of its
+        class in the signature, so no object is stored. Queries match
+        it like any other component. remove_component removes it.
+
+        >>> e = Entity()
+        >>> class T:
+        ...     pass
+        ...
+        >>> e.add_tag(T)
+        >>> e.has_component(T), e.get_component(T)
+        (True, None)
+        >>> e.remove_component(T)
+        >>> e.has_component(T)
+        False
+        """
+        self.signature |= component_bit(tag_class)
+        self.notify_structure_change()
+
+    def attach(self, component):
+        """Give the entity to components that need to know it, i.e.
+        the ones having an attach method.
+        """
+        attach = getattr(component, "attach", None)
+        if attach is not None:
+            attach(self)
+
+    def remove_component(self, component_class):
+        """Remove the component of a certain class from the entity.
+
+        Return the removed component, or None if this component does
+        not exist or is a tag.
+
+        >>> e = Entity()
+        >>> class C:
+        ...     pass
+        ...
+        >>> e.add_component(C())
+        >>> e.remove_component(C) is not None
+        True
+        >>> e.has_component(C)
+        False
+        """
+        component = self.component_map.pop(component_class, None)
+
+        if component is not None:
+            self.components.remove(component)
+            self.signature &= ~component_bit(component_class)
+            self.notify_structure_change()
+        else:
+            # A tag only has its bit in the signature.
+            bit = component_bits.get(component_class)
+            if bit is not None and self.signature & bit:
+                self.signature &= ~bit
+                self.notify_structure_change()
+
+        return component
+
+    def notify_structure_change(self):
+        """Tell the world the set of component classes has changed.
+        """
+        if self.world is not None:
+            self.world.request_update(self)
+
+    def get_archetype_signature(self):
+        """Return the signature of the entity's archetype.
+
+        It is the signature of its component and tag classes, plus the
+        bit of the Inactive marker class for deactivated entities.
+        """
+        activable = self.component_map.get(Activable)
+
+        if activable is not None and not activable.activated:
+            return self.signature | INACTIVE_BIT
+        return self.signature
 
     def has_component(self, component_class):
-        """Return True if the entity has a component of a certain class.
+        """Return True if the entity has a component or a tag of a certain
+        class.
 
         >>> e = Entity()
         >>> class C:
@@ -60,7 +243,11 @@ class Entity(object):
         >>> e.has_component(C)
         True
         """
-        return component_class in (c.__class__ for c in self.components)
+        if component_class in self.component_map:
+            return True
+
+        bit = component_bits.get(component_class)
+        return bit is not None and bool(self.signature & bit)
 
     def get_component(self, component_class):
         """Return the component of a certain class in the entity.
@@ -75,46 +262,507 @@ class Entity(object):
         >>> e.get_component(C) is not None
         True
         """
-        matching_components = [c for c in self.components
-                               if c.__class__ is component_class]
-
-        if matching_components:
-            return matching_components[0]
-        else:
-            return None
+        return self.component_map.get(component_class)
 
     def has_components(self, component_classes):
         """Return True if the entity has all components in component_classes.
         """
-        for cls in component_classes:
-            if not self.has_component(cls):
-                return False
-        return True
+        mask = component_mask(component_classes)
+        return self.signature & mask == mask
+
+
+class Archetype(object):
+    """A group of entities sharing exactly the same component classes,
+    identified by the signature of these classes.
+
+    The archetype also knows the queries it matches, so that moving an
+    entity between archetypes only updates the affected queries.
+    """
+
+    def __init__(self, signature):
+        self.signature = signature
+        self.entities = set()
+        self.queries = []
+
+
+class Query(object):
+    """A live view on the entities containing certain component classes,
+    and none of the excluded ones.
+
+    The world keeps the view up to date when entities are created,
+    removed or get new components, so iterating it does not filter
+    anything. Entities are iterated in creation order.
+    """
+
+    def __init__(self, mask, excluded_mask=0):
+        self.mask = mask
+        self.excluded_mask = excluded_mask
+        self.members = set()
+        self.entities = []
+        self.dirty = False
+
+    def add(self, entity):
+        self.members.add(entity)
+        self.dirty = True
+
+    def discard(self, entity):
+        self.members.discard(entity)
+        self.dirty = True
+
+    def add_all(self, entities):
+        self.members.update(entities)
+        self.dirty = True
+
+    def discard_all(self, entities):
+        self.members.difference_update(entities)
+        self.dirty = True
+
+    def clear(self):
+        self.members = set()
+        self.entities = []
+        self.dirty = False
+
+    def get_entities(self):
+        """Return the matching entities as a list.
+
+        The list is rebuilt, not modified, when the view changes, so it
+        can still be iterated while the world is modified. It must not
+        be modified by the caller.
+        """
+        if self.dirty:
+            self.entities = sorted(self.members, key=lambda e: e.serial)
+            self.dirty = False
+        return self.entities
+
+    def changed_since(self, component_class, change):
+        """Return the matching entities whose component of component_class
+        has been marked as changed after the change stamp.
+
+        >>> from ecs import World
+        >>> w = World()
+        >>> class A:
+        ...     def __init__(self):
+        ...         mark_changed(self)
+        ...
+        >>> view = w.query(A)
+        >>> e = w.entity()
+        >>> e.add_component(A())
+        >>> change = current_change()
+        >>> view.changed_since(A, change)
+        []
+        >>> mark_changed(e.get_component(A))
+        >>> view.changed_since(A, change) == [e]
+        True
+        """
+        return [e for e in self.get_entities()
+                if e.component_map[component_class].changed > change]
+
+    def matches(self, archetype):
+        signature = archetype.signature
+        return (signature & self.mask == self.mask
+                and not signature & self.excluded_mask)
+
+    def __iter__(self):
+        return iter(self.get_entities())
+
+    def __len__(self):
+        return len(self.members)
 
 
 class World(object):
     """An entity bag. Allow requests on them.
+
+    Entities are grouped into archetypes according to their component
+    classes. Each component class has a bit, and archetypes are keyed
+    by the signature of their classes, so that matching a query with an
+    archetype is a single mask check. Requests are answered by queries,
+    which are live views updated incrementally when the structure of the
+    world changes.
+
+    Each entity gets a generational handle: an integer made of a slot
+    index and of the generation of this slot. Slots of removed entities
+    are recycled with a new generation, so handles of removed entities
+    are detected as stale.
+
+    In deferred mode, structural changes (entity creation and removal,
+    component addition and removal, clearing) are recorded in a command
+    buffer, and only applied to archetypes and queries when flush is
+    called. Components are still readable on the entities right away.
+    Systems can then iterate queries while callbacks modify the world.
     """
 
-    def __init__(self):
+    def __init__(self, deferred=False):
+        self.deferred = deferred
+        self.commands = []
         self.entities = []
+        self.archetypes = {}
+        self.queries = {}
+        self.next_serial = 0
+        self.slots = []
+        self.generations = []
+        self.free_indices = []
 
     def entity(self):
         """Create a new entity and return it.
         """
-        e = Entity()
-        self.entities.append(e)
+        e = Entity(self)
+        self.allocate(e)
+
+        if self.deferred:
+            self.commands.append((self.register, (e,)))
+        else:
+            self.register(e)
         return e
 
+    def add_entities(self, entities):
+        """Add several entities built outside of the world, with their
+        components, and make them visible to the queries in one batch.
+
+        >>> w = World()
+        >>> class A:
+        ...     pass
+        ...
+        >>> view = w.query(A)
+        >>> entities = [Entity() for i in range(3)]
+        >>> for e in entities:
+        ...     e.add_component(A())
+        ...
+        >>> w.add_entities(entities)
+        >>> list(view) == entities
+        True
+        """
+        for e in entities:
+            e.world = self
+            self.allocate(e)
+
+        if self.deferred:
+            self.commands.append((self.register_all, (entities,)))
+        else:
+            self.register_all(entities)
+
+    def allocate(self, entity):
+        """Give a serial number and a slot to a new entity.
+        """
+        entity.serial = self.next_serial
+        self.next_serial += 1
+
+        if self.free_indices:
+            index = self.free_indices.pop()
+        else:
+            index = len(self.slots)
+            self.slots.append(None)
+            self.generations.append(0)
+        self.slots[index] = entity
+        entity.handle = (self.generations[index] << INDEX_BITS) | index
+
+    def register(self, entity):
+        """Make a new entity visible to the queries.
+        """
+        entity.dense_index = len(self.entities)
+        self.entities.append(entity)
+        self.update_archetype(entity)
+
+    def register_all(self, entities):
+        """Make several new entities visible to the queries.
+
+        The entities sharing an archetype are added to its queries
+        together.
+        """
+        groups = {}
+        for entity in entities:
+            if entity.world is not self:
+                continue
+            entity.dense_index = len(self.entities)
+            self.entities.append(entity)
+            signature = entity.get_archetype_signature()
+            groups.setdefault(signature, []).append(entity)
+
+        for signature, added in groups.iteritems():
+            archetype = self.get_archetype(signature)
+            archetype.entities.update(added)
+            for entity in added:
+                entity.archetype = archetype
+            for query in archetype.queries:
+                query.add_all(added)
+
+    def request_update(self, entity):
+        """Update the archetype of an entity whose component classes have
+        changed, or record it in deferred mode.
+        """
+        if self.deferred:
+            self.commands.append((self.update_registered, (entity,)))
+        elif entity.dense_index is not None:
+            self.update_archetype(entity)
+
+    def update_registered(self, entity):
+        if entity.world is self and entity.dense_index is not None:
+            self.update_archetype(entity)
+
+    def flush(self):
+        """Apply the recorded structural changes, in order.
+
+        >>> w = World(deferred=True)
+        >>> class A:
+        ...     pass
+        ...
+        >>> view = w.query(A)
+        >>> e = w.entity()
+        >>> e.add_component(A())
+        >>> len(view)
+        0
+        >>> w.flush()
+        >>> len(view)
+        1
+        >>> w.clear()
+        >>> e2 = w.entity()
+        >>> e2.add_component(A())
+        >>> w.flush()
+        >>> list(view) == [e2]
+        True
+        """
+        commands = self.commands
+        while commands:
+            self.commands = []
+            for command, arguments in commands:
+                command(*arguments)
+            commands = self.commands
+
+    def get(self, handle):
+        """Return the entity of a handle, or None if the handle is stale.
+
+        >>> w = World()
+        >>> e = w.entity()
+        >>> w.get(e.handle) is e
+        True
+        >>> w.remove(e)
+        >>> w.get(e.handle) is None
+        True
+        >>> w.get(w.entity().handle) is None
+        False
+        """
+        index = handle & INDEX_MASK
+        if (index < len(self.slots)
+                and self.generations[index] == handle >> INDEX_BITS):
+            return self.slots[index]
+        return None
+
+    def is_alive(self, entity):
+        """Return True if entity belongs to the world.
+        """
+        return entity.world is self and self.get(entity.handle) is entity
+
     def remove(self, entity):
         """Remove an entity from the world.
+
+        The last entity of the entities list takes the place of the
+        removed one, so the removal does not depend on the number of
+        entities. A StaleEntityError is raised if the entity has already
+        been removed.
+
+        >>> w = World()
+        >>> e = w.entity()
+        >>> w.remove(e)
+        >>> try:
+        ...     w.remove(e)
+        ... except StaleEntityError:
+        ...     print "Success"
+        ...
+        Success
         """
-        self.entities.remove(entity)
+        if not self.is_alive(entity):
+            raise StaleEntityError()
+
+        if self.deferred:
+            self.commands.append((self.remove_alive, (entity,)))
+        else:
+            self.remove_alive(entity)
+
+    def remove_alive(self, entity):
+        if not self.is_alive(entity):
+            return
+
+        last = self.entities.pop()
+        if last is not entity:
+            self.entities[entity.dense_index] = last
+            last.dense_index = entity.dense_index
+        self.free_slot(entity)
+
+        archetype = entity.archetype
+        archetype.entities.discard(entity)
+        for query in archetype.queries:
+            query.discard(entity)
+        entity.archetype = None
+        entity.world = None
+
+    def free_slot(self, entity):
+        """Give the slot of an entity back for recycling.
+        """
+        index = entity.handle & INDEX_MASK
+        self.slots[index] = None
+        self.generations[index] += 1
+        self.free_indices.append(index)
+        entity.dense_index = None
+
+    def update_archetype(self, entity):
+        """Move entity to the archetype matching its component classes.
+        """
+        signature = entity.get_archetype_signature()
+        old_archetype = entity.archetype
+
+        if old_archetype is not None:
+            if old_archetype.signature == signature:
+                return
+            old_archetype.entities.discard(entity)
+
+        archetype = self.get_archetype(signature)
+        archetype.entities.add(entity)
+        entity.archetype = archetype
+
+        if old_archetype is None:
+            for query in archetype.queries:
+                query.add(entity)
+        else:
+            for query in old_archetype.queries:
+                if query not in archetype.queries:
+                    query.discard(entity)
+            for query in archetype.queries:
+                if query not in old_archetype.queries:
+                    query.add(entity)
+
+    def update_archetypes(self, entities):
+        """Move several entities to the archetypes matching their component
+        classes.
+
+        The queries to update are computed once for all the entities
+        moving between the same two archetypes.
+        """
+        moves = {}
+        for entity in entities:
+            if entity.world is not self or entity.dense_index is None:
+                continue
+
+            signature = entity.get_archetype_signature()
+            old_archetype = entity.archetype
+            if old_archetype.signature != signature:
+                key = (old_archetype, signature)
+                moves.setdefault(key, []).append(entity)
+
+        for (old_archetype, signature), moved in moves.iteritems():
+            archetype = self.get_archetype(signature)
+            old_archetype.entities.difference_update(moved)
+            archetype.entities.update(moved)
+            for entity in moved:
+                entity.archetype = archetype
+
+            for query in old_archetype.queries:
+                if query not in archetype.queries:
+                    query.discard_all(moved)
+            for query in archetype.queries:
+                if query not in old_archetype.queries:
+                    query.add_all(moved)
+
+    def toggle_activation(self, entities):
+        """Toggle the Activable component of several entities, and move
+        them between the active and inactive partitions in one pass.
+
+        >>> w = World()
+        >>> class A:
+        ...     pass
+        ...
+        >>> active = w.query(A, exclude=[Inactive])
+        >>> entities = [w.entity() for i in range(3)]
+        >>> for e in entities:
+        ...     e.add_components(A(), Activable())
+        ...
+        >>> w.toggle_activation(entities[1:])
+        >>> list(active) == entities[:1]
+        True
+        """
+        for entity in entities:
+            activable = entity.get_component(Activable)
+            activable.set_activated(not activable.activated, False)
+
+        if self.deferred:
+            self.commands.append((self.update_archetypes, (list(entities),)))
+        else:
+            self.update_archetypes(entities)
+
+    def get_archetype(self, signature):
+        """Return the archetype of a signature, creating it if needed.
+        """
+        archetype = self.archetypes.get(signature)
+
+        if archetype is None:
+            archetype = Archetype(signature)
+            archetype.queries = [q for q in self.queries.itervalues()
+                                 if q.matches(archetype)]
+            self.archetypes[signature] = archetype
+
+        return archetype
+
+    def query(self, *components, **options):
+        """Return the live view on the entities which contain certain
+        component classes.
+
+        The exclude option is a list of component classes the entities
+        must not contain. For example, exclude=[Inactive] only keeps the
+        activated entities.
+
+        Asking twice for the same component classes returns the same
+        view.
+
+        >>> from ecs import World, Activable, Inactive
+        >>> w = World()
+        >>> class A:
+        ...     pass
+        ...
+        >>> class B:
+        ...     pass
+        ...
+        >>> view = w.query(A, B)
+        >>> e = w.entity()
+        >>> e.add_component(A())
+        >>> len(view)
+        0
+        >>> e.add_component(B())
+        >>> list(view) == [e]
+        True
+        >>> w.remove(e)
+        >>> len(view)
+        0
+        >>> w.query(B, A) is view
+        True
+        >>> active = w.query(A, exclude=[Inactive])
+        >>> e = w.entity()
+        >>> e.add_components(A(), Activable())
+        >>> len(active)
+        1
+        >>> e.get_component(Activable).toggle()
+        >>> len(active)
+        0
+        """
+        key = (
+            component_mask(components),
+            component_mask(options.get("exclude", ()))
+        )
+        query = self.queries.get(key)
+
+        if query is None:
+            query = Query(*key)
+            self.queries[key] = query
+            for archetype in self.archetypes.itervalues():
+                if query.matches(archetype):
+                    archetype.queries.append(query)
+                    for e in archetype.entities:
+                        query.add(e)
+
+        return query
 
     def get_entities(self, components):
         """Return all entities which contains certain component classes.
 
-        Return them as a list.
+        Return them as a list, in creation order. The list is shared
+        with the corresponding query, so it must not be modified.
 
         >>> from ecs import World
         >>> w = World()
@@ -134,23 +782,132 @@ class World(object):
         1
         >>> matching[0] is e1
         True
+        >>> w.get_entities([A, B]) is matching
+        True
+        >>> e2.add_component(B())
+        >>> [e is e1 for e in w.get_entities([A, B])]
+        [True, False]
         """
-        return [e for e in self.entities if e.has_components(components)]
+        return self.query(*components).get_entities()
 
     def clear(self):
-        """ Remove all entities """
+        """ Remove all entities
+
+        Queries stay registered, but become empty.
+        """
+        if self.deferred:
+            self.commands.append((self.clear_now, ()))
+        else:
+            self.clear_now()
+
+    def clear_now(self):
+        for e in self.entities:
+            self.free_slot(e)
+            e.archetype = None
+            e.world = None
         self.entities[:] = []
+        self.archetypes = {}
+        for query in self.queries.itervalues():
+            query.clear()
+
+
+class Inactive(object):
+    """Marker class added to the archetype of deactivated entities.
+
+    It is never added as a component, but queries can exclude it.
+    """
 
 
-class Activable:
+INACTIVE_BIT = component_bit(Inactive)
+
+
+class Activable(object):
     """Components for entities that can be enabled and disabled.
+
+    Changing the activation moves the entity between the active and
+    inactive partitions of its world, see Inactive.
     """
     def __init__(self, activated=True):
+        self.entity = None
         self.activated = activated
 
+    def attach(self, entity):
+        self.entity = entity
+
+    @property
+    def activated(self):
+        return self._activated
+
+    @activated.setter
+    def activated(self, activated):
+        self.set_activated(activated)
+
+    def set_activated(self, activated, notify=True):
+        """Set the activation.
+
+        If notify is False, the world is not told that the entity
+        changed its partition: the caller must do it.
+        """
+        self._activated = activated
+        mark_changed(self)
+        if notify and self.entity is not None:
+            self.entity.notify_structure_change()
+
     def toggle(self):
         self.activated = not self.activated
 
+
+class Prefab(object):
+    """Template to create many similar entities in one batch.
+
+    Shared components are added as they are to all the instances, so
+    they must never change, and they must not need to know their
+    entity. The other components are built for each instance by the
+    factories. The tags are added to all the instances too, see
+    Entity.add_tag.
+
+    >>> w = World()
+    >>> class Size:
+    ...     pass
+    ...
+    >>> class Position:
+    ...     def __init__(self, x):
+    ...         self.x = x
+    ...
+    >>> prefab = Prefab([Size()], [Position])
+    >>> entities = prefab.instantiate(w, [(1,), (2,)])
+    >>> [e.get_component(Position).x for e in entities]
+    [1, 2]
+    >>> a, b = entities
+    >>> a.get_component(Size) is b.get_component(Size)
+    True
+    >>> len(w.query(Size, Position))
+    2
+    """
+    def __init__(self, shared_components=(), component_factories=(),
+                 tags=()):
+        self.shared_components = list(shared_components)
+        self.component_factories = list(component_factories)
+        self.tags = list(tags)
+
+    def instantiate(self, world, arguments):
+        """Create one entity for each tuple of arguments, which are
+        passed to the factories, and return the entities.
+        """
+        entities = []
+        for args in arguments:
+            e = Entity()
+            e.add_components(*(
+                self.shared_components +
+                [factory(*args) for factory in self.component_factories]
+            ))
+            for tag in self.tags:
+                e.add_tag(tag)
+            entities.append(e)
+
+        world.add_entities(entities)
+        return entities
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
@@ -37,14 +37,20 @@ class FearSystem:
     """Check that frightenable entities don't look frightening entities
     """
 
+    # Component classes accessed by the system, see pipeline.SystemPipeline
+    reads = (Frightening, Frightenable, TilePositionable)
+    writes = (Frightenable,)
+
     def __init__(self, world):
         self.world = world
+        self.frightenings = world.query(Frightening, TilePositionable)
+        self.frightenables = world.query(Frightenable, TilePositionable)
 
     def update(self):
-        for frightening_entity in self.world.get_entities([Frightening, TilePositionable]):
+        for frightening_entity in self.frightenings:
             frightening = frightening_entity.get_component(Frightening)
             if frightening.moving:
-                for frightenable_entity in self.world.get_entities([Frightenable, TilePositionable]):
+                for frightenable_entity in self.frightenables:
                     frightenable = frightenable_entity.get_component(Frightenable)
                     frightenable_pos = frightenable_entity.get_component(TilePositionable)
                     frightening_pos = frightening_entity.get_component(TilePositionable)
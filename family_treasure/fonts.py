@@ -0,0 +1,82 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+from collections import OrderedDict
+import threading
+
+import pygame
+
+# Fonts indexed by (font file, size). A font file of None is the
+# default pygame font.
+fonts = {}
+# FreeType faces must not be opened by two threads at the same time,
+# and fonts are also loaded by the prefetch thread.
+font_lock = threading.Lock()
+
+# Rendered text surfaces indexed by (text, color, size, font file), the
+# least recently used first.
+text_surfaces = OrderedDict()
+max_text_surfaces = 256
+
+
+def get_font(font_type, font_size):
+    """Return the pygame font of a font file and size, loading it only
+    the first time.
+    """
+    key = (font_type, font_size)
+    font = fonts.get(key)
+
+    if font is None:
+        with font_lock:
+            font = fonts.get(key)
+            if font is None:
+                font = pygame.font.Font(font_type, font_size)
+                fonts[key] = font
+
+    return font
+
+
+def clear_cache():
+    """Forget the fonts and rendered texts, which are not valid anymore
+    after pygame.quit.
+    """
+    fonts.clear()
+    text_surfaces.clear()
+
+
+def render_text(text, color, font_size, font_type=None):
+    """Return an antialiased surface of the text.
+
+    The surfaces are cached, so they must not be modified. Only the
+    max_text_surfaces most recently used surfaces are kept.
+    """
+    key = (text, tuple(color), font_size, font_type)
+    surface = text_surfaces.pop(key, None)
+
+    if surface is None:
+        font = get_font(font_type, font_size)
+        surface = font.render(text, True, color)
+        if len(text_surfaces) >= max_text_surfaces:
+            text_surfaces.popitem(last=False)
+
+    text_surfaces[key] = surface
+    return surface
+
+
+def get_text_size(text, font_size, font_type=None):
+    """Return the (width, height) of the text, without rendering it.
+    """
+    return get_font(font_type, font_size).size(text)
@@ -14,18 +14,50 @@
 # along with The Family's treasure tale.  If not, see
 # <http://www.gnu.org/licenses/>.
 
+import os
+
 import pygame
 
 from tile import TileSystem
-from graphics import Screen, GraphicsSystem
+from graphics import Screen, OffscreenScreen, GraphicsSystem
 from ecs import World
 from mouse import MouseSystem, to_mouse_button
 from title_screen import create_title_screen
+from gameover_screen import create_gameover_screen
+from happyend_screen import create_happyend_screen
+from ingame_screen import create_ingame_screen
 from animation import AnimationSystem
 from schedule import Scheduler
 from assets import load_assets
 from light import LightSystem
 from fear import FearSystem
+import columns
+import fonts
+import sound
+import game_screen
+from pipeline import SystemPipeline
+from prefetch import AssetPrefetcher
+from recorder import FrameRecorder
+
+# Systems that are useless on some gamescreens. Other gamescreens run
+# every system.
+DISABLED_SYSTEMS = {
+    create_title_screen: ("tile", "light", "fear"),
+    create_gameover_screen: ("tile", "light", "fear"),
+    create_happyend_screen: ("tile", "light", "fear")
+}
+
+# Size of the game, in the coordinates used by the gamescreens
+GAME_SIZE = (800, 600)
+
+# Gamescreens in the order they are first played, for their assets to
+# be loaded in the background before they are needed.
+PREFETCHED_SCREENS = (
+    create_title_screen,
+    create_ingame_screen,
+    create_gameover_screen,
+    create_happyend_screen
+)
 
 class Game:
     """Basic game launcher class
@@ -34,24 +66,105 @@ class Game:
     >> game.run()
     """
 
-    def __init__(self, fps, window_size):
+    def __init__(
+            self,
+            fps,
+            window_size,
+            workers=0,
+            dirty_rects=False,
+            headless=False,
+            frames=None,
+            record=None,
+            record_raw=False,
+            resolution=None,
+            smooth_scaling=False
+    ):
+        """Initialization
+
+        The game, laid out in GAME_SIZE, is drawn at resolution, the
+        window size by default. A window of another size gets the
+        frames scaled in one pass, with smoothscale if smooth_scaling.
+        A lower resolution is faster to draw.
+
+        workers is the number of threads used to run independent
+        systems at the same time. With 0, systems run in the game loop
+        thread.
+
+        With dirty_rects, only the changed parts of the screen are
+        drawn again, see GraphicsSystem.
+
+        With headless, the game is drawn in an OffscreenScreen with the
+        SDL dummy video driver, unless another one is set. The loop
+        then never sleeps: each frame simulates 1 / fps seconds.
+
+        frames is the number of frames after which the game ends, or
+        None to play until the player quits. The number of frames
+        played is available as self.frame_count.
+
+        record is a directory in which every presented frame is
+        written by a FrameRecorder, as PNG files or, with record_raw,
+        as raw RGB frames.
+        """
         self.fps = fps
         self.window_size = window_size
+        self.workers = workers
+        self.dirty_rects = dirty_rects
+        self.headless = headless
+        self.frames = frames
+        self.record = record
+        self.record_raw = record_raw
+        self.resolution = resolution or window_size
+        self.smooth_scaling = smooth_scaling
+        self.pipeline = None
+        self.screen = None
+        self.frame_count = 0
 
     def run(self):
         """Execute the game loop
+
+        The systems run through a SystemPipeline, available as
+        self.pipeline, which records their timings.
+
+        The assets of the gamescreens are loaded by an AssetPrefetcher
+        while the previous gamescreens are played, a transition only
+        waits for the ones not loaded yet.
         """
+        if self.headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         pygame.init()
-        screen = Screen(self.window_size)
+        if self.headless:
+            screen = OffscreenScreen(GAME_SIZE, self.resolution)
+        else:
+            screen = Screen(
+                GAME_SIZE,
+                self.resolution,
+                self.window_size,
+                self.smooth_scaling
+            )
+        self.screen = screen
         clock = pygame.time.Clock()
 
-        world = World()
+        recorder = None
+        if self.record is not None:
+            recorder = FrameRecorder(
+                self.record,
+                screen.pygame_screen.get_size(),
+                self.record_raw
+            )
+
+        prefetcher = AssetPrefetcher(screen.scale)
+        for create_gamescreen_func in PREFETCHED_SCREENS:
+            prefetcher.prefetch(create_gamescreen_func)
+
+        # Structural changes are applied at the world.flush() sync points
+        # of the loop, never while a system iterates the world.
+        world = World(deferred=True)
         scheduler = Scheduler()
 
-        graphics_system = GraphicsSystem(world, screen)
+        graphics_system = GraphicsSystem(world, screen, self.dirty_rects)
         load_assets(graphics_system)
 
-        tile_system = TileSystem(world, 5)
+        tile_system = TileSystem(world, 5, columnar=columns.available)
 
         mouse_system = MouseSystem(world)
         animation_system = AnimationSystem(world)
@@ -60,13 +173,70 @@ class Game:
         
         fear_system = FearSystem(world)
 
-        clock.tick(self.fps)
+        # The world is flushed after each stage.
+        pipeline = SystemPipeline(
+            ["schedule", "simulation", "render"],
+            world.flush,
+            workers=self.workers
+        )
+        # Scheduler hooks may modify anything
+        pipeline.register("scheduler", "schedule", scheduler.update)
+        pipeline.register(
+            "animation",
+            "simulation",
+            animation_system.update,
+            animation_system.reads,
+            animation_system.writes
+        )
+        pipeline.register(
+            "tile",
+            "simulation",
+            lambda time_elapsed: tile_system.update_tile_positions(),
+            tile_system.reads,
+            tile_system.writes
+        )
+        pipeline.register(
+            "light",
+            "simulation",
+            lambda time_elapsed: light_system.update(),
+            light_system.reads,
+            light_system.writes
+        )
+        pipeline.register(
+            "fear",
+            "simulation",
+            lambda time_elapsed: fear_system.update(),
+            fear_system.reads,
+            fear_system.writes
+        )
+        pipeline.register(
+            "graphics",
+            "render",
+            lambda time_elapsed: graphics_system.draw_entities(),
+            graphics_system.reads,
+            graphics_system.writes
+        )
+        self.pipeline = pipeline
+
+        def on_transition(create_gamescreen_func):
+            pipeline.enable_all_but(
+                DISABLED_SYSTEMS.get(create_gamescreen_func, ())
+            )
+
+        if not self.headless:
+            clock.tick(self.fps)
         playing = [True]
+        self.frame_count = 0
 
         def end_game():
             playing[0] = False
 
+        prefetcher.wait(create_title_screen)
         create_title_screen(world, scheduler, end_game)
+        world.flush()
+        on_transition(create_title_screen)
+        game_screen.loading_hooks.append(prefetcher.wait)
+        game_screen.transition_hooks.append(on_transition)
 
         while playing[0]:
             for event in pygame.event.get():
@@ -74,23 +244,39 @@ class Game:
                     playing[0] = False
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     mouse_system.on_mouse_down(
-                        event.pos,
+                        screen.to_game_pos(event.pos),
                         to_mouse_button(event.button)
                     )
                 elif event.type == pygame.MOUSEMOTION:
-                    mouse_system.on_mouse_motion(event.pos)
+                    mouse_system.on_mouse_motion(
+                        screen.to_game_pos(event.pos)
+                    )
+            world.flush()
 
-            clock.tick(self.fps)
-            time_elapsed = float(clock.get_time()) / 1000.0
+            if self.headless:
+                time_elapsed = 1.0 / self.fps
+            else:
+                clock.tick(self.fps)
+                time_elapsed = float(clock.get_time()) / 1000.0
+
+            pipeline.run(time_elapsed)
+            if recorder is not None:
+                recorder.capture(screen.pygame_screen)
 
-            scheduler.update(time_elapsed)
-            animation_system.update(time_elapsed)
-            tile_system.update_tile_positions()
-            light_system.update()
-            fear_system.update()
-            graphics_system.draw_entities()
+            if not self.headless:
+                pygame.display.set_caption(
+                    "The Family's Treasure Tale --- " + str(clock.get_fps()))
 
-            pygame.display.set_caption(
-                "The Family's Treasure Tale --- " + str(clock.get_fps()))
+            self.frame_count += 1
+            if self.frames is not None and self.frame_count >= self.frames:
+                playing[0] = False
 
+        game_screen.loading_hooks.remove(prefetcher.wait)
+        game_screen.transition_hooks.remove(on_transition)
+        pipeline.close()
+        prefetcher.close()
+        if recorder is not None:
+            recorder.close()
+        fonts.clear_cache()
+        sound.clear_cache()
         pygame.quit()
@@ -16,9 +16,21 @@
 
 import pygame
 
+# Functions called with the gamescreen creation function before it
+# creates the gamescreen, to load its assets.
+loading_hooks = []
+
+# Functions called with the gamescreen creation function after each
+# transition.
+transition_hooks = []
+
 def transition(world, scheduler, end_game, create_gamescreen_func):
     """ Remove all the world's entities and setup a new gamescreen"""
     world.clear()
     scheduler.reset()
+    for hook in loading_hooks:
+        hook(create_gamescreen_func)
     create_gamescreen_func(world, scheduler, end_game)
     pygame.mouse.set_cursor(*pygame.cursors.tri_left)
+    for hook in transition_hooks:
+        hook(create_gamescreen_func)
@@ -15,10 +15,15 @@
 # <http://www.gnu.org/licenses/>.
 
 import pygame
+from ecs import mark_changed
 
 
 class Positionable(object):
     """Component for entities that have a position at screen.
+
+    Changes are stamped with ecs.mark_changed. The position can be
+    bound to a columns.ColumnStore providing "x", "y" and "height"
+    columns, in which case the properties read and write the store.
     """
 
     def __init__(self, x, y, w, h):
@@ -29,39 +34,80 @@ class Positionable(object):
         w: width
         h: height
         """
-        self.rect = pygame.Rect(x, y, w, h)
+        self._rect = pygame.Rect(x, y, w, h)
+        self.store = None
+        self.slot = None
+        mark_changed(self)
+
+    def bind(self, store, slot):
+        """Move the position to a slot of a column store.
+        """
+        store.set("x", slot, self._rect.left)
+        store.set("y", slot, self._rect.top)
+        store.set("height", slot, self._rect.height)
+        self.store = store
+        self.slot = slot
+
+    def unbind(self):
+        """Move the position back from the column store to the component.
+        """
+        self._rect.topleft = (self.x, self.y)
+        self.store = None
+        self.slot = None
+
+    @property
+    def rect(self):
+        if self.store is not None:
+            self._rect.topleft = (self.x, self.y)
+        return self._rect
 
     @property
     def x(self):
-        return self.rect.left
+        if self.store is None:
+            return self._rect.left
+        return self.store.get("x", self.slot)
 
     @x.setter
     def x(self, x):
-        self.rect.left = x
+        if self.store is None:
+            self._rect.left = x
+        else:
+            self.store.set("x", self.slot, x)
+        mark_changed(self)
 
     @property
     def y(self):
-        return self.rect.top
+        if self.store is None:
+            return self._rect.top
+        return self.store.get("y", self.slot)
 
     @y.setter
     def y(self, y):
-        self.rect.top = y
+        if self.store is None:
+            self._rect.top = y
+        else:
+            self.store.set("y", self.slot, y)
+        mark_changed(self)
 
     @property
     def width(self):
-        return self.rect.width
+        return self._rect.width
 
     @width.setter
     def width(self, width):
-        self.rect.width = width
+        self._rect.width = width
+        mark_changed(self)
 
     @property
     def height(self):
-        return self.rect.height
+        return self._rect.height
 
     @height.setter
     def height(self, height):
-        self.rect.height = height
+        self._rect.height = height
+        if self.store is not None:
+            self.store.set("height", self.slot, self._rect.height)
+        mark_changed(self)
 
     @property
     def pygame_rect(self):
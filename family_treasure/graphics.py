@@ -14,34 +14,449 @@
 # along with The Family's treasure tale.  If not, see
 # <http://www.gnu.org/licenses/>.
 
+from bisect import bisect, insort
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
 import pygame
 import data
+import fonts
 
 from geometry import Positionable
-from ecs import Activable
+from ecs import Activable, Inactive, mark_changed, current_change
+
+
+# Surfaces filled with a translucent color, indexed by (size, color),
+# the least recently used first. Their total area is kept under
+# max_fill_area pixels.
+fill_surfaces = OrderedDict()
+max_fill_area = 2 * 800 * 600
+fill_area = 0
+
+
+def get_fill_surface(size, color):
+    """Return a surface of size filled with color, with per-pixel alpha.
+
+    The surfaces are cached, so they must not be modified.
+    """
+    global fill_area
+    key = (tuple(size), tuple(color))
+    surface = fill_surfaces.pop(key, None)
+
+    if surface is None:
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        surface.fill(color)
+        fill_area += size[0] * size[1]
+        while fill_surfaces and fill_area > max_fill_area:
+            (w, h), _ = fill_surfaces.popitem(last=False)[0]
+            fill_area -= w * h
+
+    fill_surfaces[key] = surface
+    return surface
+
+
+# Scaled copies of surfaces, indexed by scale, then by surface. A copy
+# is forgotten with its surface.
+scaled_surfaces = {}
+
+
+def get_scale(size, resolution):
+    """Return the (x, y) scale from a size to a resolution.
+    """
+    return (
+        float(resolution[0]) / size[0],
+        float(resolution[1]) / size[1]
+    )
+
+
+def scale_pos(pos, scale):
+    return (int(round(pos[0] * scale[0])), int(round(pos[1] * scale[1])))
+
+
+def scale_font_size(font_size, scale):
+    """Return the size a font of font_size is rendered at on a canvas
+    of some scale.
+    """
+    return int(round(font_size * scale[1]))
+
+
+def scale_rect(rect, scale):
+    """Return a scaled copy of rect.
+
+    The edges are scaled rather than the size, so rectangles sharing an
+    edge still share it once scaled.
+    """
+    rect = pygame.Rect(rect)
+    left, top = scale_pos(rect.topleft, scale)
+    right, bottom = scale_pos(rect.bottomright, scale)
+    return pygame.Rect(left, top, right - left, bottom - top)
+
+
+def get_scaled_surface(surface, scale):
+    """Return a copy of surface scaled by (scale_x, scale_y).
+
+    The copy is made only once per scale, so surface must not be
+    modified afterwards, unless forget_scaled_surface is called.
+    """
+    surfaces = scaled_surfaces.get(scale)
+    if surfaces is None:
+        surfaces = WeakKeyDictionary()
+        scaled_surfaces[scale] = surfaces
+
+    scaled = surfaces.get(surface)
+    if scaled is None:
+        size = scale_pos(surface.get_size(), scale)
+        colorkey = surface.get_colorkey()
+        if colorkey is not None:
+            # Smoothing would blend the key color in the edges.
+            scaled = pygame.transform.scale(surface, size)
+            scaled.set_colorkey(colorkey, surface.get_flags() & pygame.RLEACCEL)
+        elif surface.get_bitsize() in (24, 32):
+            scaled = pygame.transform.smoothscale(surface, size)
+        else:
+            scaled = pygame.transform.scale(surface, size)
+        surfaces[surface] = scaled
+
+    return scaled
+
+
+def forget_scaled_surface(surface):
+    """Forget the scaled copies of a surface which was modified in place.
+    """
+    for surfaces in scaled_surfaces.itervalues():
+        surfaces.pop(surface, None)
+
+
+class Canvas(object):
+    """Draws on a pygame surface, the screen or an offscreen surface.
+
+    The coordinates are the ones of the game. With a scale other than
+    (1, 1), the surface has another resolution: coordinates, rectangles
+    and font sizes are scaled, and the surfaces are drawn from scaled
+    copies made once, see get_scaled_surface.
+    """
+
+    def __init__(self, surface, scale=(1, 1)):
+        self.pygame_screen = surface
+        self.scale = tuple(scale)
+        self.scaled = self.scale != (1, 1)
+
+    def fill(self, color):
+        """Fill the canvas with some color.
+        """
+        self.pygame_screen.fill(color)
+
+    def set_clip(self, rect):
+        """Restrict the following draw operations to a rectangle, or
+        remove the restriction if rect is None.
+        """
+        if self.scaled and rect is not None:
+            rect = scale_rect(rect, self.scale)
+        self.pygame_screen.set_clip(rect)
+
+    def get_rect(self):
+        """Return the rectangle of the canvas, in game coordinates.
+        """
+        rect = self.pygame_screen.get_rect()
+        if self.scaled:
+            rect = scale_rect(rect, (1 / self.scale[0], 1 / self.scale[1]))
+        return rect
+
+    def blit(self, surface, dest, prescaled=False):
+        """Draw a surface at dest, which is (x, y) or a pygame.Rect.
+
+        With prescaled, the surface is already at the resolution of
+        the canvas, and is drawn as is.
+        """
+        if self.scaled:
+            if not prescaled:
+                surface = get_scaled_surface(surface, self.scale)
+            dest = scale_pos(dest, self.scale)
+        self.pygame_screen.blit(surface, dest)
+
+    def blits(self, blit_sequence):
+        """Draw several surfaces, given as a sequence of (surface, dest),
+        in one call.
+        """
+        if self.scaled:
+            scale = self.scale
+            blit_sequence = [
+                (get_scaled_surface(surface, scale), scale_pos(dest, scale))
+                for surface, dest in blit_sequence
+            ]
+        self.pygame_screen.blits(blit_sequence, 0)
+
+    def draw_rect(self, color, rect, width=0):
+        """Draw a rectangle, filled if width is 0, stroked otherwise.
+
+        color: (r, g, b[, a])
+        rect: pygame.Rect
+        """
+        if self.scaled:
+            rect = scale_rect(rect, self.scale)
+            if width:
+                width = max(1, int(round(width * self.scale[1])))
+
+        if width:
+            pygame.draw.rect(self.pygame_screen, color, rect, width)
+        elif len(color) < 4 or color[3] == 255:
+            self.pygame_screen.fill(color, rect)
+        else:
+            s = get_fill_surface(rect.size, color)
+            self.pygame_screen.blit(s, rect.topleft)
+
+    def draw_text(self, text, color, font_size, font_type, pos):
+        """Draw a text with its top left corner at pos.
+        """
+        if self.scaled:
+            # The text is rendered at the resolution of the canvas.
+            font_size = scale_font_size(font_size, self.scale)
+            pos = scale_pos(pos, self.scale)
+        text_surface = fonts.render_text(text, color, font_size, font_type)
+        self.pygame_screen.blit(text_surface, pos)
 
 
-class Screen(object):
+class Screen(Canvas):
     """Represents the game screen.
+
+    The game, laid out in size, is drawn at resolution, size by
+    default, and presented in a window of window_size, resolution by
+    default. When the window has another size, the frames are drawn
+    offscreen and scaled to the window in one pass, with
+    pygame.transform.smoothscale if smooth.
     """
 
-    def __init__(self, size):
+    def __init__(self, size, resolution=None, window_size=None, smooth=False):
+        resolution = tuple(resolution or size)
+        window_size = tuple(window_size or resolution)
         pygame.display.set_icon(
             pygame.image.load(data.filepath("ftt_icon.png"))
         )
-        self.pygame_screen = pygame.display.set_mode(size)
+        self.window = pygame.display.set_mode(window_size)
+        surface = self.window
+        if window_size != resolution:
+            surface = pygame.Surface(resolution, 0, self.window)
+        Canvas.__init__(self, surface, get_scale(size, resolution))
 
-    def fill(self, color):
-        """Fill the screen with some color.
-        """
-        self.pygame_screen.fill(color)
+        self.window_size = window_size
+        self.window_scale = get_scale(size, window_size)
+        self.smooth = smooth and self.window.get_bitsize() in (24, 32)
 
     def flip(self):
 
         """Update screen with previously applied draw operations.
         """
+        self.present()
         pygame.display.flip()
 
+    def update(self, rects):
+        """Update only some rectangles of the screen, in game
+        coordinates.
+        """
+        self.present()
+        if self.window_scale != (1, 1):
+            rects = [scale_rect(rect, self.window_scale) for rect in rects]
+        pygame.display.update(rects)
+
+    def present(self):
+        """Scale the frame to the window, if it is drawn offscreen.
+        """
+        if self.pygame_screen is self.window:
+            return
+        if self.smooth:
+            pygame.transform.smoothscale(
+                self.pygame_screen,
+                self.window_size,
+                self.window
+            )
+        else:
+            pygame.transform.scale(
+                self.pygame_screen,
+                self.window_size,
+                self.window
+            )
+
+    def to_game_pos(self, pos):
+        """Return the game coordinates of a position in the window.
+        """
+        return scale_pos(
+            pos,
+            (1 / self.window_scale[0], 1 / self.window_scale[1])
+        )
+
+
+class OffscreenScreen(Canvas):
+    """Game screen drawn in a plain surface, without a window.
+
+    The game, laid out in size, is drawn at resolution, size by
+    default.
+
+    Images are still converted to the display pixel format, so a
+    display is set if there is none: it is only hidden with the SDL
+    dummy video driver. Nothing is presented.
+    """
+
+    def __init__(self, size, resolution=None):
+        resolution = tuple(resolution or size)
+        if pygame.display.get_surface() is None:
+            pygame.display.set_mode((1, 1), 0, 32)
+        Canvas.__init__(
+            self,
+            pygame.Surface(resolution, 0, pygame.display.get_surface()),
+            get_scale(size, resolution)
+        )
+
+    def flip(self):
+        pass
+
+    def update(self, rects):
+        pass
+
+    def to_game_pos(self, pos):
+        return pos
+
+    def get_array(self):
+        """Return a copy of the last frame, as a NumPy array of shape
+        (width, height, 3). NumPy is required.
+        """
+        return pygame.surfarray.array3d(self.pygame_screen)
+
+
+class DisplayList(object):
+    """Records the draw operations of a Brush instead of drawing them.
+
+    It is used in place of a Canvas, see GraphicsSystem: the
+    operations can be compared with the ones of the previous frame,
+    and replayed on the screen later. bounds is the rectangle covering
+    all the operations, or None if nothing is drawn. See replay_all.
+    """
+
+    def __init__(self):
+        self.operations = []
+        self.bounds = None
+
+    def record(self, operation, rect):
+        self.operations.append(operation)
+        if self.bounds is None:
+            self.bounds = rect
+        else:
+            self.bounds = self.bounds.union(rect)
+
+    def blit(self, surface, dest):
+        if isinstance(dest, pygame.Rect):
+            dest = dest.topleft
+        self.record(
+            ("blit", (surface, dest)),
+            surface.get_rect().move(dest)
+        )
+
+    def draw_rect(self, color, rect, width=0):
+        self.record(("draw_rect", (color, rect, width)), rect)
+
+    def draw_text(self, text, color, font_size, font_type, pos):
+        self.record(
+            ("draw_text", (text, color, font_size, font_type, pos)),
+            pygame.Rect(pos, fonts.get_text_size(text, font_size, font_type))
+        )
+
+
+def replay_all(display_lists, canvas):
+    """Apply the operations of several display lists on a Canvas, in
+    order.
+
+    Consecutive blits are gathered in a single Canvas.blits call.
+    """
+    blits = []
+    for display_list in display_lists:
+        for name, args in display_list.operations:
+            if name == "blit":
+                blits.append(args)
+                continue
+            if blits:
+                canvas.blits(blits)
+                blits = []
+            getattr(canvas, name)(*args)
+
+    if blits:
+        canvas.blits(blits)
+
+
+# Pixel formats of sprites, see get_pixel_format
+OPAQUE = "opaque"
+COLORKEY = "colorkey"
+ALPHA = "alpha"
+
+# Color of the transparent pixels of COLORKEY sprites
+TRANSPARENT_KEY = (255, 0, 255)
+
+
+def get_pixel_format(surface):
+    """Return the cheapest pixel format which draws a surface exactly:
+    OPAQUE when it has no transparent pixel, COLORKEY when its pixels
+    are either opaque or fully transparent, and ALPHA otherwise.
+    """
+    if not surface.get_flags() & pygame.SRCALPHA:
+        if surface.get_colorkey() is None:
+            return OPAQUE
+        surface = surface.convert_alpha()
+
+    opaque = pygame.mask.from_surface(surface, 254)
+    opaque_count = opaque.count()
+    if opaque_count == surface.get_width() * surface.get_height():
+        return OPAQUE
+
+    if opaque_count == pygame.mask.from_surface(surface, 0).count():
+        keyed = pygame.mask.from_threshold(
+            surface,
+            TRANSPARENT_KEY,
+            (1, 1, 1, 255)
+        )
+        # An opaque pixel of the key color would be transparent.
+        if not keyed.overlap_area(opaque, (0, 0)):
+            return COLORKEY
+
+    return ALPHA
+
+
+def convert_sprite(surface, pixel_format):
+    """Return a copy of a surface in the display format, converted to
+    pixel_format, see get_pixel_format.
+
+    Opaque and color keyed surfaces are blitted without blending, and
+    color keyed ones are run-length encoded, which skips their
+    transparent pixels.
+    """
+    if pixel_format == OPAQUE:
+        converted = surface.convert()
+        # convert keeps the per-pixel alpha flag of the surface, though
+        # the display format has no alpha channel.
+        converted.set_alpha(None)
+        return converted
+
+    if pixel_format == COLORKEY:
+        converted = pygame.Surface(surface.get_size()).convert()
+        converted.fill(TRANSPARENT_KEY)
+        converted.blit(surface, (0, 0))
+        converted.set_colorkey(TRANSPARENT_KEY, pygame.RLEACCEL)
+        return converted
+
+    return surface.convert_alpha()
+
+
+def load_sprite(sprite_dict, filename):
+    """Return the surface of a sprite, loading it with pygame.image.load
+    and storing it in sprite_dict if it is missing.
+
+    The surface is converted to the cheapest pixel format for its
+    transparency.
+    """
+    surface = sprite_dict.get(filename)
+    if surface is None:
+        image = pygame.image.load(data.filepath(filename))
+        surface = convert_sprite(image, get_pixel_format(image))
+        sprite_dict[filename] = surface
+    return surface
+
 
 class Brush(object):
     """A helper class to draw things on screen.
@@ -50,7 +465,8 @@ class Brush(object):
     def __init__(self, screen, pos, sprite_dict):
         """Initialization
 
-        screen: Object of type Screen
+        screen: Object of type Canvas, usually the Screen, or a
+        DisplayList recording the draw operations
         pos: (x, y)
         sprite_dict: a dicitionary of pygame.Surface indexed by sprite names
         """
@@ -73,53 +489,36 @@ class Brush(object):
         pos: (x, y)
         size: (w, h)
         """
-        if stroked:
-            pygame.draw.rect(
-                self.screen.pygame_screen,
-                color,
-                pygame.Rect(
-                    pos[0] + self.x,
-                    pos[1] + self.y,
-                    size[0],
-                    size[1]
-                ),
-                1
-            )
-        else:
-            s = pygame.Surface(size, pygame.SRCALPHA)
-            s.fill(color)
-            self.screen.pygame_screen.blit(
-                s,
-                (pos[0] + self.x, pos[1] + self.y)
-            ) 
+        self.screen.draw_rect(
+            color,
+            pygame.Rect(pos[0] + self.x, pos[1] + self.y, size[0], size[1]),
+            1 if stroked else 0
+        )
 
     def draw_text(self, text, color, font_size, font_type=None):
         """Draw a text
 
         color: (r, g, b)
         """
-        font = pygame.font.Font(font_type, font_size)
-        text_surface = font.render(text, True, color)
-        text_rect = text_surface.get_rect().move(self.x, self.y)
-        self.screen.pygame_screen.blit(text_surface, text_rect)
+        self.screen.draw_text(
+            text,
+            color,
+            font_size,
+            font_type,
+            (self.x, self.y)
+        )
 
     def draw_image(self, filename, offset=(0, 0)):
         """ Draw an image
         Use pygame.image.load when the sprite has not been loaded
         Then, get the pygame.Surface in the sprite dictionary
         """
-        if filename in self.sprite_dict:
-            surface = self.sprite_dict[filename]
-        else:
-            surface = pygame.image.load(data.filepath(filename)).convert_alpha()
-            self.sprite_dict[filename] = surface
-
-        rect = surface.get_rect().move(self.x + offset[0], self.y + offset[1])
-        self.screen.pygame_screen.blit(surface, rect)
+        surface = load_sprite(self.sprite_dict, filename)
+        self.screen.blit(surface, (self.x + offset[0], self.y + offset[1]))
 
     def blit(self, surface, rect):
         """Do things with the pygame way"""
-        self.screen.pygame_screen.blit(surface, rect)
+        self.screen.blit(surface, rect)
 
     def get_translated(self, dx, dy):
         """Return a new brush with an offset of dx, dy.
@@ -131,16 +530,77 @@ class Renderable(object):
     """A component for entities that can be drawn on the screen.
 
     It encapsulates a render function that contains the draw
-    instructions. The render function takes a Brush as parameter.
+    instructions. The render function takes a Brush as parameter. An
+    entity drawn as an image can have a Sprite component instead.
 
     As some entities must be rendered on top of others, the Renderable
     component also has a layer number. A higher layer will be drawn on
-    top of a lower layer.
+    top of a lower layer. The layer can be bound to a
+    columns.ColumnStore, see geometry.Positionable.
+
+    A render function drawing a surface which is modified in place must
+    report the modified area with damage, see GraphicsSystem.
+
+    visible_area is a pygame.Rect outside of which the entity is hidden,
+    or None: the entity is not drawn at all if it does not overlap it,
+    see tile.TileSpace.
     """
 
     def __init__(self, render_func, layer):
-        self.render_func = render_func
-        self.layer = layer
+        self._render_func = render_func
+        self._layer = layer
+        self.store = None
+        self.slot = None
+        self.damaged = None
+        self.visible_area = None
+        mark_changed(self)
+
+    @property
+    def render_func(self):
+        return self._render_func
+
+    @render_func.setter
+    def render_func(self, render_func):
+        self._render_func = render_func
+        mark_changed(self)
+
+    def damage(self, rect):
+        """Report that the drawing changed inside rect, relative to the
+        position of the entity, although the draw operations did not.
+        """
+        if self.damaged is None:
+            self.damaged = pygame.Rect(rect)
+        else:
+            self.damaged.union_ip(rect)
+
+    def bind(self, store, slot):
+        """Move the layer to a slot of a column store providing a
+        "layer" column.
+        """
+        store.set("layer", slot, self._layer)
+        self.store = store
+        self.slot = slot
+
+    def unbind(self):
+        """Move the layer back from the column store to the component.
+        """
+        self._layer = self.layer
+        self.store = None
+        self.slot = None
+
+    @property
+    def layer(self):
+        if self.store is None:
+            return self._layer
+        return self.store.get("layer", self.slot)
+
+    @layer.setter
+    def layer(self, layer):
+        if self.store is None:
+            self._layer = layer
+        else:
+            self.store.set("layer", self.slot, layer)
+        mark_changed(self)
 
     def render_image(self, image, offset=(0, 0)):
         """A helper function to make renderable render an image.
@@ -148,6 +608,38 @@ class Renderable(object):
         self.render_func = lambda brush: brush.draw_image(image, offset)
 
 
+class Sprite(object):
+    """A component for renderable entities drawn as a single image.
+
+    GraphicsSystem blits the image of the sprite dictionary named key,
+    at offset from the entity position, instead of calling the render
+    function of the Renderable, which only gives the layer and can be
+    None. Nothing is drawn while key is None.
+    """
+
+    def __init__(self, key, offset=(0, 0)):
+        self.key = key
+        self.offset = offset
+
+    @property
+    def key(self):
+        return self._key
+
+    @key.setter
+    def key(self, key):
+        self._key = key
+        mark_changed(self)
+
+
+class Static(object):
+    """Tag of renderable entities which always draw the same thing until
+    their Positionable, Renderable, Sprite or Colorable changes, like
+    the room tiles and the furniture. It is added with Entity.add_tag.
+
+    GraphicsSystem draws them once on a background surface.
+    """
+
+
 class Colorable(object):
     """A component for monochrome renderable entities.
     It encapsulates their color"""
@@ -157,47 +649,403 @@ class Colorable(object):
         """
         self.color = c
 
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, c):
+        self._color = c
+        mark_changed(self)
+
     def set_color(self, c):
         self.color = c
 
 
+class RenderQueue(object):
+    """Entities ordered by layer, kept from one frame to the next.
+
+    Entities are bucketed by layer, and each bucket is kept in creation
+    order, so the order is the same as a stable sort of the entities
+    by layer. Moving an entity only touches its old and new buckets.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.layers = []
+        self.entity_layers = {}
+        self.entities = []
+        self.dirty = False
+
+    def insert(self, entity, layer):
+        bucket = self.buckets.get(layer)
+        if bucket is None:
+            bucket = self.buckets[layer] = []
+            insort(self.layers, layer)
+
+        if bucket and bucket[-1].serial > entity.serial:
+            serials = [e.serial for e in bucket]
+            bucket.insert(bisect(serials, entity.serial), entity)
+        else:
+            bucket.append(entity)
+        self.entity_layers[entity] = layer
+        self.dirty = True
+
+    def remove(self, entity):
+        layer = self.entity_layers.pop(entity)
+        bucket = self.buckets[layer]
+        bucket.remove(entity)
+        if not bucket:
+            del self.buckets[layer]
+            self.layers.remove(layer)
+        self.dirty = True
+
+    def move(self, entity, layer):
+        """Move an entity to the bucket of a new layer, if it changed.
+        """
+        if self.entity_layers[entity] != layer:
+            self.remove(entity)
+            self.insert(entity, layer)
+
+    def get_entities(self):
+        """Return the entities ordered by layer.
+
+        As with ecs.Query.get_entities, the list is rebuilt, not
+        modified, when the queue changes.
+        """
+        if self.dirty:
+            buckets = self.buckets
+            self.entities = [
+                e for layer in self.layers for e in buckets[layer]
+            ]
+            self.dirty = False
+        return self.entities
+
+    def __contains__(self, entity):
+        return entity in self.entity_layers
+
+    def __iter__(self):
+        return iter(self.entity_layers)
+
+
+def merge_rects(rects):
+    """Return rectangles covering the given ones, none of them
+    overlapping another.
+    """
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+def is_visible(rect, screen_rect, visible_area):
+    """Return True if rect overlaps the screen and the visible area,
+    which may be None.
+    """
+    return (
+        rect is not None
+        and rect.colliderect(screen_rect)
+        and (visible_area is None or rect.colliderect(visible_area))
+    )
+
+
 class GraphicsSystem(object):
     """System in charge of drawing entities on the screen.
+
+    Entities outside the screen or the visible area of their Renderable
+    are culled. A render function is expected to draw inside the
+    Positionable rectangle of its entity: it is not called when this
+    rectangle is not visible. Sprite entities are culled with the
+    bounds of their image.
     """
 
-    def __init__(self, world, screen):
+    # Component classes accessed by the system, see pipeline.SystemPipeline
+    reads = (Positionable, Renderable, Sprite, Colorable, Activable)
+    writes = (Renderable,)
+
+    def __init__(self, world, screen, dirty_rects=False):
+        """Initialization
+
+        In dirty_rects mode, only the parts of the screen where the
+        drawing of some entities changed are drawn again and updated,
+        instead of the whole screen.
+        """
         self.world = world
         self.screen = screen
         self.sprite_dict = {}
+        self.renderables = world.query(
+            Positionable,
+            Renderable,
+            exclude=[Inactive]
+        )
+        self.last_change = 0
+        self.queued_from = None
+        self.render_queue = RenderQueue()
+        self.dirty_rects = dirty_rects
+        self.display_lists = None
+        self.statics = world.query(
+            Positionable,
+            Renderable,
+            Static,
+            exclude=[Inactive]
+        )
+        self.colored_statics = world.query(
+            Colorable,
+            Static,
+            exclude=[Inactive]
+        )
+        self.sprite_statics = world.query(
+            Sprite,
+            Static,
+            exclude=[Inactive]
+        )
+        self.static_change = 0
+        self.statics_from = None
+        self.static_lists = {}
+        self.baked_entities = None
+        self.background = None
 
     def draw_entities(self):
         """Draw the renderable entities on the screen.
+
+        The static entities are drawn from the background, see
+        get_background, unless an entity drawn before them overlaps
+        them.
         """
-        self.screen.fill((0, 0, 0))
-        entities = self.world.get_entities([Positionable, Renderable])
-        entities.sort(key=lambda e: e.get_component(Renderable).layer)
+        if self.dirty_rects:
+            self.draw_dirty_entities()
+            return
+
+        entities = self.get_sorted_entities()
+        static_lists = self.get_static_lists()
+        screen_rect = self.screen.get_rect()
+        baked = []
+        foreground = []
+        covered = []
         for entity in entities:
-            if self.is_entity_activated(entity):
-                positionable = entity.get_component(Positionable)
-                renderable = entity.get_component(Renderable)
-                brush = Brush(
-                    self.screen,
-                    (positionable.x, positionable.y),
-                    self.sprite_dict
-                )
+            visible_area = entity.get_component(Renderable).visible_area
+            display_list = static_lists.get(entity)
+            if display_list is None:
+                if self.is_culled(entity, screen_rect, visible_area):
+                    continue
+                display_list = DisplayList()
+                self.render(entity, display_list)
+
+            if not is_visible(display_list.bounds, screen_rect, visible_area):
+                continue
 
-                if entity.has_component(Colorable):
-                    colorable = entity.get_component(Colorable)
-                    renderable.render_func(brush, colorable.color)
-                else:
-                    renderable.render_func(brush)
+            if (entity in static_lists
+                    and display_list.bounds.collidelist(covered) == -1):
+                # The background is drawn first: the entity can be on it
+                # if the entities drawn before it do not overlap it.
+                baked.append(entity)
+                continue
+
+            foreground.append(display_list)
+            covered.append(display_list.bounds)
+
+        self.screen.blit(self.get_background(baked), (0, 0), True)
+        replay_all(foreground, self.screen)
 
         self.screen.flip()
 
-    def is_entity_activated(self, entity):
-        """Return true if the entity is activated.
+    def get_static_lists(self):
+        """Return the display lists of the static entities, recording
+        again the ones which changed.
+        """
+        since = self.static_change
+        self.static_change = current_change()
+        static_lists = self.static_lists
+        statics = self.statics
+
+        changed = set(statics.changed_since(Positionable, since))
+        changed.update(statics.changed_since(Renderable, since))
+        changed.update(self.colored_statics.changed_since(Colorable, since))
+        changed.update(self.sprite_statics.changed_since(Sprite, since))
+        if changed:
+            # The background must be drawn again
+            self.baked_entities = None
+
+        entities = statics.get_entities()
+        if entities is not self.statics_from or changed:
+            self.statics_from = entities
+            members = statics.members
+            for entity in [e for e in static_lists if e not in members]:
+                del static_lists[entity]
+            for entity in entities:
+                if entity in changed or entity not in static_lists:
+                    display_list = DisplayList()
+                    self.render(entity, display_list)
+                    static_lists[entity] = display_list
+
+        return static_lists
+
+    def get_background(self, baked):
+        """Return the background surface, with the baked static entities
+        drawn on it in order.
+
+        It is only drawn again when the baked entities change, or when
+        one of them changed.
+        """
+        if baked != self.baked_entities:
+            self.baked_entities = baked
+            screen_surface = self.screen.pygame_screen
+            if self.background is None:
+                self.background = pygame.Surface(
+                    screen_surface.get_size(),
+                    0,
+                    screen_surface
+                )
+            canvas = Canvas(self.background, self.screen.scale)
+            canvas.fill((0, 0, 0))
+            replay_all([self.static_lists[e] for e in baked], canvas)
+
+        return self.background
+
+    def is_culled(self, entity, screen_rect, visible_area):
+        """Return True if the entity is drawn by a render function, and
+        its Positionable rectangle is not visible.
+        """
+        if entity.has_component(Sprite):
+            return False
+        return not is_visible(
+            entity.get_component(Positionable).rect,
+            screen_rect,
+            visible_area
+        )
+
+    def render(self, entity, canvas):
+        """Draw an entity on canvas, a Canvas or a DisplayList: blit its
+        Sprite, or call its render function with a brush.
         """
-        return not entity.has_component(Activable) or entity.get_component(Activable).activated
+        positionable = entity.get_component(Positionable)
+        sprite = entity.get_component(Sprite)
+        if sprite is not None:
+            if sprite.key is None:
+                return
+            offset = sprite.offset
+            canvas.blit(
+                load_sprite(self.sprite_dict, sprite.key),
+                (positionable.x + offset[0], positionable.y + offset[1])
+            )
+            return
+
+        renderable = entity.get_component(Renderable)
+        brush = Brush(
+            canvas,
+            (positionable.x, positionable.y),
+            self.sprite_dict
+        )
+
+        if entity.has_component(Colorable):
+            colorable = entity.get_component(Colorable)
+            renderable.render_func(brush, colorable.color)
+        else:
+            renderable.render_func(brush)
+
+    def draw_dirty_entities(self):
+        """Draw the entities in dirty_rects mode.
+
+        The render functions are still called each frame, but they are
+        recorded in display lists. Entities whose layer or display list
+        changed since the previous frame, removed entities, and damaged
+        renderables give the dirty rectangles: there, the screen is
+        cleared and all the entities touching them are drawn again in
+        layer order.
+        """
+        entities = self.get_sorted_entities()
+        screen_rect = self.screen.get_rect()
+        previous = self.display_lists
+        current = {}
+        damaged = {}
+        display_lists = []
+        for entity in entities:
+            renderable = entity.get_component(Renderable)
+            if renderable.damaged is not None:
+                damaged[entity] = renderable.damaged
+                renderable.damaged = None
+            visible_area = renderable.visible_area
+            if self.is_culled(entity, screen_rect, visible_area):
+                continue
+            display_list = DisplayList()
+            self.render(entity, display_list)
+            if not is_visible(display_list.bounds, screen_rect, visible_area):
+                continue
+            current[entity] = (renderable.layer, display_list)
+            display_lists.append(display_list)
+        self.display_lists = current
+
+        if previous is None:
+            self.screen.fill((0, 0, 0))
+            replay_all(display_lists, self.screen)
+            self.screen.flip()
+            return
+
+        dirty = []
+        for entity, (layer, display_list) in current.iteritems():
+            old = previous.pop(entity, None)
+            if old is None:
+                dirty.append(display_list.bounds)
+            elif (old[0] != layer
+                  or old[1].operations != display_list.operations):
+                dirty.append(old[1].bounds)
+                dirty.append(display_list.bounds)
+            elif entity in damaged:
+                positionable = entity.get_component(Positionable)
+                dirty.append(damaged[entity].move(
+                    positionable.x,
+                    positionable.y
+                ))
+        for layer, display_list in previous.itervalues():
+            dirty.append(display_list.bounds)
+
+        rects = [r.clip(screen_rect)
+                 for r in merge_rects(r for r in dirty if r is not None)]
+        rects = [r for r in rects if r.width and r.height]
+        if not rects:
+            return
+
+        for rect in rects:
+            self.screen.set_clip(rect)
+            self.screen.fill((0, 0, 0))
+            replay_all(
+                [l for l in display_lists if l.bounds.colliderect(rect)],
+                self.screen
+            )
+        self.screen.set_clip(None)
+        self.screen.update(rects)
+
+    def get_sorted_entities(self):
+        """Return the activated renderable entities sorted by layer.
+
+        The render queue is kept between frames: only the renderables
+        which have been added, removed or changed their layer are moved
+        in it.
+        """
+        since = self.last_change
+        self.last_change = current_change()
+        queue = self.render_queue
+        entities = self.renderables.get_entities()
+
+        if entities is not self.queued_from:
+            self.queued_from = entities
+            members = self.renderables.members
+            for entity in [e for e in queue if e not in members]:
+                queue.remove(entity)
+            for entity in entities:
+                if entity not in queue:
+                    renderable = entity.get_component(Renderable)
+                    queue.insert(entity, renderable.layer)
+
+        for entity in self.renderables.changed_since(Renderable, since):
+            queue.move(entity, entity.get_component(Renderable).layer)
+
+        return queue.get_entities()
 
     def get_minimal_layer(self, entities):
         """Return the minimal layer of the entities' renderable components.
@@ -250,8 +1098,10 @@ class GraphicsSystem(object):
         fourth rom: right -> left orientation
         Each row contains first an idle sprite, then several movement sprites
         sprite_size is the size of a single sprite of the charset
+        The image is not converted to the display format, as the
+        sprites are packed in the atlas, see assets.build_atlas
         """
-        charset_surface = pygame.image.load(data.filepath(filename)).convert_alpha()
+        charset_surface = pygame.image.load(data.filepath(filename))
         sprites_per_row = charset_surface.get_rect().width / sprite_size[0]
 
         for i in range(len(row_names)):
@@ -272,12 +1122,14 @@ class GraphicsSystem(object):
         top wall version of the sprite.
         Four pygame.Surface are created and labelled:
         filename_t.png, filename_b.png, filename_l.png, filename_r.png
+        The image is not converted to the display format, as the
+        sprites are packed in the atlas, see assets.build_atlas
         """
         partition = filename.partition('.')
         base_name = partition[0]
         extension = partition[1] + partition[2]
 
-        top_surface = pygame.image.load(data.filepath(filename)).convert_alpha()
+        top_surface = pygame.image.load(data.filepath(filename))
         self.sprite_dict[base_name + "_t" + extension] = top_surface
 
         left_surface = pygame.transform.rotate(top_surface, 90)
@@ -19,8 +19,10 @@ from mouse import Clickable, Button, add_cursor_change_hoverable
 from game_screen import transition as gamescreen_transition
 from title_screen import create_title_screen
 from data import filepath
+from prefetch import uses_assets
 
 
+@uses_assets(fonts=[(filepath("bilbo/Bilbo-Regular.otf"), 100)])
 def create_happyend_screen(world, scheduler, end_game):
     happyend = create_text_entity(
         world,
@@ -35,7 +35,7 @@ from sky import create_sky_effect
 # -----
 from geometry import Positionable
 from tile import TilePositionable
-from graphics import Renderable
+from graphics import Renderable, Sprite, Static
 from ecs import Activable
 from character import CharacterDirection, create_character
 from game_screen import transition
@@ -46,74 +46,79 @@ from animation import TileMoveAnimation, Animable, FlickerAnimation
 from mouse import Clickable, Button, add_cursor_change_hoverable
 from fear import Frightenable, Frightening
 from sound import SoundSystem
+from prefetch import uses_assets
+
+# Sound names of the ingame screen associated to their file
+SOUNDS = {
+    "furniture": "sound/furniture.ogg",
+    "furniture-short": "sound/furniture-short.ogg",
+    "bubble": "sound/pop.ogg",
+    "wind": "sound/wind.ogg",
+    "window": "sound/window.ogg",
+    "cash-register": "sound/cash-register.ogg"
+}
 
 
 def create_building(world, scenario_state, sound_system):
     up_door = world.entity()
     up_door.add_components(
         Positionable(0, 0, 50, 100),
-        Renderable(
-            lambda brush: brush.draw_image("door2_t.png"),
-            3
-        ),
+        Renderable(None, 3),
+        Sprite("door2_t.png"),
         TilePositionable("wall", (8, 1), 1),
         Activable(False)
     )
+    up_door.add_tag(Static)
 
     left_door = world.entity()
     left_door.add_components(
         Positionable(0, 0, 50, 100),
-        Renderable(
-            lambda brush: brush.draw_image("door2_l.png"),
-            3
-        ),
+        Renderable(None, 3),
+        Sprite("door2_l.png"),
         TilePositionable("wall", (0, 6), 3),
         Activable(False)
     )
+    left_door.add_tag(Static)
 
     down_door = world.entity()
     down_door.add_components(
         Positionable(0, 0, 50, 100),
-        Renderable(
-            lambda brush: brush.draw_image("door2_b.png"),
-            3
-        ),
+        Renderable(None, 3),
+        Sprite("door2_b.png"),
         TilePositionable("wall", (8, 10), 3),
         Activable(False)
     )
+    down_door.add_tag(Static)
 
     right_door = world.entity()
     right_door.add_components(
         Positionable(0, 0, 100, 50),
-        Renderable(
-            lambda brush: brush.draw_image("door2_r.png"),
-            3
-        ),
+        Renderable(None, 3),
+        Sprite("door2_r.png"),
         TilePositionable("wall", (12, 6), 3),
         Activable(False)
     )
+    right_door.add_tag(Static)
 
     up_window = world.entity()
     up_window.add_components(
         Positionable(0, 0, 100, 100),
-        Renderable(
-            lambda brush: brush.draw_image("window_t.png"),
-            1
-        ),
+        Renderable(None, 1),
+        Sprite("window_t.png"),
         TilePositionable("wall", (7, 1), 1),
         Activable(False)
     )
+    up_window.add_tag(Static)
 
     left_window = world.entity()
     left_window.add_components(
         Positionable(0, 0, 100, 100),
-        Renderable(
-            lambda brush: brush.draw_image("window_l.png"),
-            1
-        ),
+        Renderable(None, 1),
+        Sprite("window_l.png"),
         TilePositionable("wall", (0, 3), 1),
         Activable(False)
     )
+    left_window.add_tag(Static)
 
     down_window_renderable = Renderable(
         lambda brush: brush.draw_image("window_b.png"),
@@ -141,6 +146,7 @@ def create_building(world, scenario_state, sound_system):
         ),
         Activable(False)
     )
+    down_window.add_tag(Static)
     add_cursor_change_hoverable(down_window)
 
     def is_activated(entity):
@@ -169,12 +175,11 @@ def create_building(world, scenario_state, sound_system):
         bookshelf = world.entity()
         bookshelf.add_components(
             Positionable(0, 0, 50, 100),
-            Renderable(
-                lambda brush: brush.draw_image("bookshelf.png"),
-                1
-            ),
+            Renderable(None, 1),
+            Sprite("bookshelf.png"),
             TilePositionable("ground", (i, 1), 1)
         )
+        bookshelf.add_tag(Static)
 
         if i == 2:
             def bookshelf_move(animable, scenario_state, direction, duration):
@@ -225,10 +230,8 @@ def create_building(world, scenario_state, sound_system):
     fireplace = world.entity()
     fireplace.add_components(
         Positionable(0, 0, 100, 100),
-        Renderable(
-            lambda brush: brush.draw_image("fireplace.png"),
-            1
-        ),
+        Renderable(None, 1),
+        Sprite("fireplace.png"),
         TilePositionable("ground", (8, 1), 1),
         Lightable(
             Positionable(-130, 60, 360, 120),
@@ -237,25 +240,24 @@ def create_building(world, scenario_state, sound_system):
         ),
         fireplace_anim
     )
+    fireplace.add_tag(Static)
 
     scenario_state["fireplace"] = fireplace
 
 
 def close_compartment(compartment):
-    renderable = compartment.get_component(Renderable)
-    renderable.render_func = lambda brush: brush.draw_image("compartment.png")
+    compartment.get_component(Sprite).key = "compartment.png"
 
 
 def create_compartment(world, scenario_state):
     compartment = world.entity()
     compartment.add_components(
         Positionable(0, 0, 50, 50),
-        Renderable(
-            lambda brush: brush.draw_image("compartment_open.png"),
-            1
-        ),
+        Renderable(None, 1),
+        Sprite("compartment_open.png"),
         TilePositionable("wall", (2, 0.3), 2)
     )
+    compartment.add_tag(Static)
 
     scenario_state["compartment"] = compartment
 
@@ -634,18 +636,10 @@ def setup_animation(world, scheduler, end_game, scenario_state, sound_system):
         ))
 
 
+@uses_assets(sounds=SOUNDS.values())
 def create_ingame_screen(world, scheduler, end_game):
     """ Create entities for the ingame screen """
-    sound_system = SoundSystem(
-        {
-            "furniture": "sound/furniture.ogg",
-            "furniture-short": "sound/furniture-short.ogg",
-            "bubble": "sound/pop.ogg",
-            "wind": "sound/wind.ogg",
-            "window": "sound/window.ogg",
-            "cash-register": "sound/cash-register.ogg"
-        }
-    )
+    sound_system = SoundSystem(SOUNDS)
 
     create_room(world, sound_system)
     scenario_state = {}
@@ -16,10 +16,11 @@
 
 import pygame
 from geometry import Positionable
-from graphics import Renderable, Colorable
+from graphics import Renderable, Colorable, forget_scaled_surface
+from ecs import mark_changed, current_change
 
 
-class Lightable:
+class Lightable(object):
     """Component for entities that emit light"""
 
     def __init__(self, inner_light_ellipse, outer_light_ellipse, color):
@@ -29,81 +30,182 @@ class Lightable:
         self.inner_light_ellipse = inner_light_ellipse
         self.outer_light_ellipse = outer_light_ellipse
         self.color = color
-        self.toggled = False
+        self._toggled = False
         self.flicker = 0.0
 
+    @property
+    def toggled(self):
+        return self._toggled
+
+    @property
+    def flicker(self):
+        return self._flicker
+
+    @flicker.setter
+    def flicker(self, flicker):
+        self._flicker = flicker
+        mark_changed(self)
+
     def toggle(self, bool=True):
-        self.toggled = bool
+        self._toggled = bool
+        mark_changed(self)
 
 
 class LightSystem:
     """System that creates the light from the sky and
-    lightable entities"""
+    lightable entities
+
+    The light is only recomputed when the sky or the lights changed,
+    and when only some lights changed, only their area is drawn again.
+    """
 
     def __init__(self, world):
+        from sky import Sky
+
+        # Component classes accessed by the system, see
+        # pipeline.SystemPipeline. The Renderable of the sky is written.
+        self.reads = (Sky, Positionable, Colorable, Lightable)
+        self.writes = (Renderable,)
+
         self.world = world
+        self.skies = world.query(Sky)
+        self.lights = world.query(Positionable, Lightable)
+        self.last_change = 0
+        self.updated_skies = None
+        self.updated_lights = None
+        self.light_surfaces = {}
 
     def update(self):
-        from sky import Sky
-
-        for sky_entity in self.world.get_entities([Sky]):
+        since = self.last_change
+        self.last_change = current_change()
+        if not self.has_changed(since):
+            return
+
+        light_surfaces = {}
+        ellipses = self.get_light_ellipses()
+        for sky_entity in self.skies:
             sky_pos = sky_entity.get_component(Positionable)
             sky_color = sky_entity.get_component(Colorable).color
-            light_surface = pygame.Surface(
-                (sky_pos.width, sky_pos.height),
-                pygame.SRCALPHA
+            sky_rect = pygame.Rect(
+                sky_pos.x,
+                sky_pos.y,
+                sky_pos.width,
+                sky_pos.height
             )
-            light_surface.fill(sky_color)
-            #light_surface.set_clip(100, 100, 500, 400)
-
-            light_entities = self.world.get_entities([Positionable, Lightable])
-            # First pass, outer lights
-            for entity in light_entities:
-                light = entity.get_component(Lightable)
+            r = sky_entity.get_component(Renderable)
 
-                if light.toggled:
-                    pos = entity.get_component(Positionable)
-                    self.draw_light_ellipse(
+            previous = self.light_surfaces.get(sky_entity)
+            if (previous is None
+                    or previous[1] != sky_rect
+                    or previous[2] != sky_color):
+                light_surface = pygame.Surface(
+                    sky_rect.size,
+                    pygame.SRCALPHA
+                )
+                self.draw_lights(light_surface, None, sky_color, ellipses)
+                r.render_func = self.get_render_func(light_surface, sky_rect)
+            else:
+                # Only the light ellipses that changed are drawn again,
+                # in place, and the renderable is told where.
+                light_surface = previous[0]
+                damage = self.get_damage(previous[3], ellipses)
+                if damage is not None:
+                    self.draw_lights(
                         light_surface,
-                        pos,
-                        light.outer_light_ellipse,
-                        self.fade_color(light.color, 3 + light.flicker)
+                        damage,
+                        sky_color,
+                        ellipses
                     )
+                    forget_scaled_surface(light_surface)
+                    r.damage(damage)
+
+            light_surfaces[sky_entity] = (
+                light_surface,
+                sky_rect,
+                sky_color,
+                ellipses
+            )
+
+        self.light_surfaces = light_surfaces
 
-            # Second pass, inner lights
+    def get_render_func(self, light_surface, sky_rect):
+        return lambda brush, color: brush.blit(light_surface, sky_rect)
+
+    def get_light_ellipses(self):
+        """Return the (rect, color) of the light ellipses to draw, in
+        order: the outer lights first, then the inner lights.
+        """
+        ellipses = []
+        light_entities = self.lights.get_entities()
+        for light_ellipse_name, ratio in [
+                ("outer_light_ellipse", 3),
+                ("inner_light_ellipse", 1)
+        ]:
             for entity in light_entities:
                 light = entity.get_component(Lightable)
 
                 if light.toggled:
                     pos = entity.get_component(Positionable)
-                    self.draw_light_ellipse(
-                        light_surface,
-                        pos,
-                        light.inner_light_ellipse,
-                        self.fade_color(light.color, 1 + light.flicker)
+                    light_ellipse = getattr(light, light_ellipse_name)
+                    light_rect = pygame.Rect(
+                        light_ellipse.x,
+                        light_ellipse.y,
+                        light_ellipse.width,
+                        light_ellipse.height
                     )
+                    ellipses.append((
+                        light_rect.move(pos.x, pos.y),
+                        self.fade_color(light.color, ratio + light.flicker)
+                    ))
 
-            sky_rect = pygame.Rect(
-                sky_pos.x,
-                sky_pos.y,
-                sky_pos.width,
-                sky_pos.height
-            )
-            r = sky_entity.get_component(Renderable)
-            r.render_func = lambda brush, color: brush.blit(
-                light_surface,
-                sky_rect
-            )
+        return ellipses
+
+    def get_damage(self, old_ellipses, ellipses):
+        """Return the rectangle of the light surface that differs between
+        two lists of ellipses, or None if they are the same.
+        """
+        if old_ellipses == ellipses:
+            return None
+
+        changed = (
+            [rect for rect, color in old_ellipses
+             if (rect, color) not in ellipses]
+            + [rect for rect, color in ellipses
+               if (rect, color) not in old_ellipses]
+        )
+        if not changed:
+            # Same ellipses in another order
+            changed = [rect for rect, color in ellipses]
+
+        return changed[0].unionall(changed[1:])
 
-    def draw_light_ellipse(self, light_surface, pos, light_ellipse, color):
-        light_rect = pygame.Rect(
-            light_ellipse.x,
-            light_ellipse.y,
-            light_ellipse.width,
-            light_ellipse.height
+    def draw_lights(self, light_surface, clip, sky_color, ellipses):
+        """Draw the sky color and the light ellipses on the light surface,
+        only inside clip unless it is None.
+        """
+        light_surface.set_clip(clip)
+        light_surface.fill(sky_color)
+        for light_rect, color in ellipses:
+            pygame.draw.ellipse(light_surface, color, light_rect)
+        light_surface.set_clip(None)
+
+    def has_changed(self, since):
+        """Return True if skies or lights have been added, removed or
+        modified since the change stamp.
+        """
+        skies = self.skies.get_entities()
+        lights = self.lights.get_entities()
+        if skies is not self.updated_skies or lights is not self.updated_lights:
+            self.updated_skies = skies
+            self.updated_lights = lights
+            return True
+
+        return bool(
+            self.skies.changed_since(Colorable, since)
+            or self.skies.changed_since(Positionable, since)
+            or self.lights.changed_since(Lightable, since)
+            or self.lights.changed_since(Positionable, since)
         )
-        light_rect = light_rect.move(pos.x, pos.y)
-        pygame.draw.ellipse(light_surface, color, light_rect)
 
     def fade_color(self, color, ratio):
         return (
@@ -16,7 +16,7 @@
 
 import pygame
 from geometry import Positionable
-from ecs import Activable
+from ecs import Inactive
 
 class Button:
     LEFT, RIGHT = range(2)
@@ -39,42 +39,45 @@ class Hoverable(object):
 
 class MouseSystem(object):
     """ System called when mouse events are catched. It manages entities
-interactions with the mouse """
+interactions with the mouse. Deactivated entities are ignored. """
 
     def __init__(self, world):
         self.world = world
+        self.clickables = world.query(
+            Positionable,
+            Clickable,
+            exclude=[Inactive]
+        )
+        self.hoverables = world.query(
+            Positionable,
+            Hoverable,
+            exclude=[Inactive]
+        )
 
     def on_mouse_down(self, pos, button):
         """ Called when the mouse button was clicked on the (x,y) position.
         Search for a clickable entity and thus, call its callback """
-        for entity in self.world.get_entities([Positionable, Clickable]):
-            if self.is_entity_activated(entity):
-                positionable = entity.get_component(Positionable)
-                clickable = entity.get_component(Clickable)
+        for entity in self.clickables:
+            positionable = entity.get_component(Positionable)
+            clickable = entity.get_component(Clickable)
 
-                if positionable.contains(pos) and clickable.button == button:
-                    clickable.callback()
+            if positionable.contains(pos) and clickable.button == button:
+                clickable.callback()
 
     def on_mouse_motion(self, pos):
         """ Called when the mouse was moved into the (x,y) position.
         Search for a hoverable entity and thus, call the adequate callback """
-        for entity in self.world.get_entities([Positionable, Hoverable]):
-            if self.is_entity_activated(entity):
-                positionable = entity.get_component(Positionable)
-                hoverable = entity.get_component(Hoverable)
-
-                if positionable.contains(pos) and not hoverable.is_hovered:
-                    hoverable.is_hovered = True
-                    hoverable.callback_hovered()
-
-                if not positionable.contains(pos) and hoverable.is_hovered:
-                    hoverable.is_hovered = False
-                    hoverable.callback_unhovered()
-
-    def is_entity_activated(self, entity):
-        """Return True if the entity is activated.
-        """
-        return not entity.has_component(Activable) or entity.get_component(Activable).activated
+        for entity in self.hoverables:
+            positionable = entity.get_component(Positionable)
+            hoverable = entity.get_component(Hoverable)
+
+            if positionable.contains(pos) and not hoverable.is_hovered:
+                hoverable.is_hovered = True
+                hoverable.callback_hovered()
+
+            if not positionable.contains(pos) and hoverable.is_hovered:
+                hoverable.is_hovered = False
+                hoverable.callback_unhovered()
 
 def to_mouse_button(b):
     if b == 1:
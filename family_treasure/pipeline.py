@@ -0,0 +1,202 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from timeit import default_timer
+
+
+class SystemEntry(object):
+    """A system registered in a pipeline.
+
+    reads and writes are the sets of component classes the system
+    accesses. None means the system may access anything.
+    """
+
+    def __init__(self, name, stage, update_func, history, reads, writes):
+        self.name = name
+        self.stage = stage
+        self.update_func = update_func
+        self.enabled = True
+        self.timings = deque(maxlen=history)
+        self.reads = frozenset(reads) if reads is not None else None
+        self.writes = frozenset(writes) if writes is not None else None
+
+    def conflicts_with(self, other):
+        """Return True if the two systems can not run at the same time.
+        """
+        if (self.reads is None or self.writes is None
+                or other.reads is None or other.writes is None):
+            return True
+
+        return bool(
+            self.writes & (other.reads | other.writes)
+            or other.writes & self.reads
+        )
+
+    def run(self, time_elapsed):
+        start = default_timer()
+        self.update_func(time_elapsed)
+        self.timings.append(default_timer() - start)
+
+
+class SystemPipeline(object):
+    """Run systems stage by stage, and record how long each one takes.
+
+    Stages run in the order given at initialization. Each system can be
+    enabled or disabled, for example according to the current screen.
+
+    The systems of a stage are split into batches: a system goes in the
+    batch following the last one holding an earlier system it conflicts
+    with, according to the component classes they read and write.
+    Batches run in order, and with worker threads, the systems of a
+    batch run at the same time. Results are then the same as running
+    the systems in their registration order.
+    """
+
+    def __init__(self, stages, sync_func=None, history=120, workers=0):
+        """Initialization
+
+        stages: the list of stage names, in execution order
+        sync_func: a function called after each stage, or None
+        history: the number of timings kept per system
+        workers: the number of threads running systems in parallel. With
+        0, systems run one after another in the calling thread.
+        """
+        self.stages = stages
+        self.sync_func = sync_func
+        self.history = history
+        self.batches = dict((stage, []) for stage in stages)
+        self.entries = {}
+        self.pool = ThreadPool(workers) if workers > 0 else None
+
+    def register(self, name, stage, update_func, reads=None, writes=None):
+        """Add a system to a stage.
+
+        update_func is called with the elapsed time, in seconds, each
+        time the pipeline runs. reads and writes are the component
+        classes the system reads and modifies. If they are not given,
+        the system never runs at the same time as another one.
+
+        >>> class Position:
+        ...     pass
+        ...
+        >>> class Velocity:
+        ...     pass
+        ...
+        >>> class Sound:
+        ...     pass
+        ...
+        >>> state = {}
+        >>> def move(time_elapsed):
+        ...     state["x"] = 1
+        ...
+        >>> def follow(time_elapsed):
+        ...     state["camera_x"] = state.get("x")
+        ...
+        >>> def nothing(time_elapsed):
+        ...     pass
+        ...
+        >>> p = SystemPipeline(["update"], workers=2)
+        >>> p.register("move", "update", move, [Velocity], [Position])
+        >>> p.register("camera", "update", follow, [Position], [])
+        >>> p.register("sound", "update", nothing, [], [Sound])
+        >>> p.register("script", "update", nothing)
+        >>> p.register("music", "update", nothing, [Sound], [])
+        >>> [[e.name for e in batch] for batch in p.batches["update"]]
+        [['move', 'sound'], ['camera'], ['script'], ['music']]
+        >>> p.run(0.016)
+        >>> state["camera_x"]
+        1
+        >>> p.close()
+        """
+        entry = SystemEntry(
+            name,
+            stage,
+            update_func,
+            self.history,
+            reads,
+            writes
+        )
+
+        batches = self.batches[stage]
+        index = 0
+        for i, batch in enumerate(batches):
+            if any(entry.conflicts_with(other) for other in batch):
+                index = i + 1
+
+        if index == len(batches):
+            batches.append([])
+        batches[index].append(entry)
+        self.entries[name] = entry
+
+    def enable(self, *names):
+        for name in names:
+            self.entries[name].enabled = True
+
+    def disable(self, *names):
+        for name in names:
+            self.entries[name].enabled = False
+
+    def enable_all_but(self, names):
+        """Enable every system, except the ones in names.
+        """
+        for name, entry in self.entries.iteritems():
+            entry.enabled = name not in names
+
+    def run(self, time_elapsed):
+        """Run all the enabled systems, and record their timings.
+        """
+        for stage in self.stages:
+            for batch in self.batches[stage]:
+                entries = [e for e in batch if e.enabled]
+
+                if self.pool is not None and len(entries) > 1:
+                    self.pool.map(lambda e: e.run(time_elapsed), entries)
+                else:
+                    for entry in entries:
+                        entry.run(time_elapsed)
+
+            if self.sync_func is not None:
+                self.sync_func()
+
+    def close(self):
+        """Stop the worker threads.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def get_timings(self, name):
+        """Return the last recorded timings of a system, in seconds.
+        """
+        return list(self.entries[name].timings)
+
+    def get_average_timings(self):
+        """Return a dictionary associating each system name to its
+        average recorded time, in seconds.
+        """
+        averages = {}
+        for name, entry in self.entries.iteritems():
+            if entry.timings:
+                averages[name] = sum(entry.timings) / len(entry.timings)
+        return averages
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,125 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+import threading
+from Queue import Queue
+
+from fonts import get_font
+from graphics import scale_font_size
+from sound import load_sound
+
+
+class AssetManifest:
+    """The files a gamescreen uses.
+
+    sounds are data file names, as given to load_sound. fonts are
+    (font file, size) pairs, as given to get_font.
+    """
+
+    def __init__(self, sounds=(), fonts=()):
+        self.sounds = list(sounds)
+        self.fonts = list(fonts)
+
+
+def uses_assets(sounds=(), fonts=()):
+    """Decorator declaring the assets of a gamescreen creation function.
+
+    The AssetManifest is available as the manifest attribute of the
+    function.
+    """
+    def declare(create_gamescreen_func):
+        create_gamescreen_func.manifest = AssetManifest(sounds, fonts)
+        return create_gamescreen_func
+    return declare
+
+
+def load_manifest(manifest, scale=(1, 1)):
+    """Load the assets of a manifest in their caches.
+
+    scale is the one of the canvas the texts are drawn on, whose fonts
+    are loaded at their rendered size too.
+    """
+    for filename in manifest.sounds:
+        load_sound(filename)
+    for font_type, font_size in manifest.fonts:
+        # The declared size still measures the texts.
+        get_font(font_type, font_size)
+        if scale != (1, 1):
+            get_font(font_type, scale_font_size(font_size, scale))
+
+
+class AssetPrefetcher:
+    """Loads the assets of gamescreens in a background thread.
+
+    Manifests are loaded in the order they are prefetched, so the
+    assets of the next gamescreens are decoded while the current one
+    is played. wait is meant to be a loading hook: it only blocks
+    while the assets of a gamescreen are not loaded yet.
+
+    scale is the one of the canvas the texts are drawn on, see
+    load_manifest.
+    """
+
+    def __init__(self, scale=(1, 1)):
+        self.scale = tuple(scale)
+        self.queue = Queue()
+        # threading.Event set once the manifest is loaded, indexed by
+        # manifest
+        self.loaded = {}
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def prefetch(self, create_gamescreen_func):
+        """Queue the loading of the assets of a gamescreen creation
+        function, if it declares some.
+        """
+        manifest = getattr(create_gamescreen_func, "manifest", None)
+        if manifest is None or manifest in self.loaded:
+            return
+        self.loaded[manifest] = threading.Event()
+        self.queue.put(manifest)
+
+    def wait(self, create_gamescreen_func):
+        """Block until the assets of a gamescreen creation function are
+        loaded.
+        """
+        self.prefetch(create_gamescreen_func)
+        manifest = getattr(create_gamescreen_func, "manifest", None)
+        if manifest is not None:
+            self.loaded[manifest].wait()
+
+    def run(self):
+        while True:
+            manifest = self.queue.get()
+            if manifest is None:
+                return
+            try:
+                load_manifest(manifest, self.scale)
+            except Exception:
+                # Any error is left to the gamescreen, which fails again
+                # when it loads the asset itself, in the game loop
+                # thread. The thread keeps loading the next manifests,
+                # which are waited for.
+                pass
+            finally:
+                self.loaded[manifest].set()
+
+    def close(self):
+        """Stop the thread once the queued manifests are loaded.
+        """
+        self.queue.put(None)
+        self.thread.join()
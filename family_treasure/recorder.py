@@ -0,0 +1,162 @@
+# This file is part of The Family's treasure tale.
+
+# The Family's treasure tale is free software: you can redistribute it
+# and/or modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation, either version 3 of
+# the License, or (at your option) any later version.
+
+# The Family's treasure tale is distributed in the hope that it will
+# be useful, but WITHOUT ANY WARRANTY; without even the implied
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with The Family's treasure tale.  If not, see
+# <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import sys
+import threading
+import zlib
+from Queue import Queue
+
+import pygame
+
+
+def png_chunk(chunk_type, data):
+    """Return a PNG chunk, with its length and CRC.
+    """
+    crc = zlib.crc32(chunk_type + data) & 0xffffffff
+    return struct.pack(">I", len(data)) + chunk_type + data + \
+        struct.pack(">I", crc)
+
+
+def write_png(filename, size, pixels, level=1):
+    """Write 24 bits RGB pixels, as returned by pygame.image.tostring,
+    to a PNG file.
+
+    Unlike pygame.image.save, other threads keep running while the
+    pixels are compressed.
+    """
+    width, height = size
+    stride = width * 3
+    # Each row starts with its filter type, 0 for none.
+    rows = "".join(
+        "\0" + pixels[start:start + stride]
+        for start in xrange(0, height * stride, stride)
+    )
+
+    with open(filename, "wb") as png_file:
+        png_file.write("\x89PNG\r\n\x1a\n")
+        png_file.write(png_chunk(
+            "IHDR",
+            struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        ))
+        png_file.write(png_chunk("IDAT", zlib.compress(rows, level)))
+        png_file.write(png_chunk("IEND", ""))
+
+
+class FrameRecorder:
+    """Writes the presented frames to a directory, in a background
+    thread.
+
+    Frames are written as a PNG sequence, frame-00000.png,
+    frame-00001.png, ... With raw, they are appended to a single file,
+    frames-<width>x<height>.rgb, as 24 bits RGB pixels.
+
+    A captured frame is copied in one of max_pending surfaces, which
+    the writer thread gives back once the frame is written. So the
+    surfaces are allocated only once, and capture only blocks when
+    the writer is max_pending frames late.
+
+    If a frame cannot be written, the next frames are dropped and the
+    error is raised by the next call to capture or close.
+    """
+
+    def __init__(self, directory, size, raw=False, max_pending=8):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.directory = directory
+        self.frame_count = 0
+
+        self.raw_file = None
+        if raw:
+            self.raw_file = open(
+                os.path.join(directory, "frames-%dx%d.rgb" % tuple(size)),
+                "wb"
+            )
+
+        # Surfaces the frames are copied in, None until first used
+        self.free_surfaces = Queue()
+        for _ in xrange(max_pending):
+            self.free_surfaces.put(None)
+        # (frame index, surface) pairs to write, None to stop
+        self.frames = Queue()
+        # sys.exc_info() of the error which stopped the writing
+        self.error = None
+
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def capture(self, surface):
+        """Queue the writing of the current content of a surface.
+        """
+        self.raise_error()
+        copy = self.free_surfaces.get()
+        if copy is None:
+            copy = surface.copy()
+        else:
+            copy.blit(surface, (0, 0))
+        self.frames.put((self.frame_count, copy))
+        self.frame_count += 1
+
+    def run(self):
+        while True:
+            frame = self.frames.get()
+            if frame is None:
+                return
+            index, surface = frame
+            if self.error is not None:
+                # The surfaces of dropped frames still go back to the
+                # pool, so that capture never blocks.
+                self.free_surfaces.put(surface)
+                continue
+            try:
+                self.write_frame(index, surface)
+            except Exception:
+                self.error = sys.exc_info()
+
+    def write_frame(self, index, surface):
+        try:
+            pixels = pygame.image.tostring(surface, "RGB")
+            size = surface.get_size()
+        finally:
+            self.free_surfaces.put(surface)
+
+        if self.raw_file is not None:
+            self.raw_file.write(pixels)
+        else:
+            write_png(
+                os.path.join(self.directory, "frame-%05d.png" % index),
+                size,
+                pixels
+            )
+
+    def raise_error(self):
+        """Raise the error which stopped the writing of the frames, if
+        any.
+        """
+        if self.error is not None:
+            error_type, error, traceback = self.error
+            raise error_type, error, traceback
+
+    def close(self):
+        """Write the queued frames and stop the thread.
+        """
+        self.frames.put(None)
+        self.thread.join()
+        if self.raw_file is not None:
+            self.raw_file.close()
+        self.raise_error()
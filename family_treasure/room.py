@@ -14,13 +14,38 @@
 # along with The Family's treasure tale.  If not, see
 # <http://www.gnu.org/licenses/>.
 
+from ecs import Prefab
 from geometry import Positionable
 from tile import TileSpace, TilePositionable
-from graphics import Renderable
+from graphics import Renderable, Sprite, Static
 from animation import TileMoveAnimation, Animable
 from mouse import Clickable, Button, add_cursor_change_hoverable
 
 
+def create_tiles(world, tile_space_name, sprite, size, layer, positions):
+    """Create one Static entity per tile position in one batch.
+
+    All the entities share the same Sprite component, so sprite is
+    either a key of the sprite dictionary, or a (key, offset) tuple.
+    """
+    if isinstance(sprite, tuple):
+        sprite = Sprite(*sprite)
+    else:
+        sprite = Sprite(sprite)
+
+    width, height = size
+    prefab = Prefab(
+        [sprite],
+        [
+            lambda pos: Positionable(0, 0, width, height),
+            lambda pos: Renderable(None, 0),
+            lambda pos: TilePositionable(tile_space_name, pos, layer)
+        ],
+        [Static]
+    )
+    return prefab.instantiate(world, [(pos,) for pos in positions])
+
+
 def create_room(
         world,
         sound_system,
@@ -39,125 +64,85 @@ def create_room(
     inner_resolution: tile resolution of the ground
     """
 
+    # The walls are drawn one tile above and right of the outer area,
+    # nothing of the room is visible outside.
+    w, h = outer_resolution
+    clip = (
+        outer_positionable.x,
+        outer_positionable.y - h,
+        outer_positionable.width + w,
+        outer_positionable.height + h
+    )
+
     # ground
     tile_ground = world.entity()
     tile_ground.add_components(
         inner_positionable,
-        TileSpace("ground", inner_resolution)
+        TileSpace("ground", inner_resolution, clip)
     )
 
     w, h = inner_resolution
-
-    for i in range(inner_positionable.width / w):
-        for j in range(inner_positionable.height / h):
-            e = world.entity()
-            e.add_components(
-                Positionable(0, 0, w, h),
-                Renderable(
-                    lambda brush: brush.draw_image(ground_sprite, (0, 50)),
-                    0
-                ),
-                TilePositionable("ground", (i, j), 0)
-            )
+    create_tiles(
+        world,
+        "ground",
+        (ground_sprite, (0, 50)),
+        (w, h),
+        0,
+        [(i, j)
+         for i in range(inner_positionable.width / w)
+         for j in range(inner_positionable.height / h)]
+    )
 
     # wall
     tile_wall = world.entity()
     tile_wall.add_components(
         outer_positionable,
-        TileSpace("wall", outer_resolution)
+        TileSpace("wall", outer_resolution, clip)
     )
     w, h = outer_resolution
     w_max = outer_positionable.width / w
     h_max = outer_positionable.height / h
     # corners
-    tl = world.entity()
-    tl.add_components(
-        Positionable(0, 0, 2*w, 2*h),
-        Renderable(
-            lambda brush: brush.draw_image(corner_sprite+"_tl.png"),
-            0
-        ),
-        TilePositionable("wall", (0, 1), -10)
-    )
-    tr = world.entity()
-    tr.add_components(
-        Positionable(0, 0, 2*w, 2*h),
-        Renderable(
-            lambda brush: brush.draw_image(corner_sprite+"_tr.png"),
-            0
-        ),
-        TilePositionable("wall", (w_max, 1), -10)
-    )
-    bl = world.entity()
-    bl.add_components(
-        Positionable(0, 0, 2*w, 2*h),
-        Renderable(
-            lambda brush: brush.draw_image(corner_sprite+"_bl.png"),
-            0
-        ),
-        TilePositionable("wall", (0, h_max), -10)
-    )
-    br = world.entity()
-    br.add_components(
-        Positionable(0, 0, 2*w, 2*h),
-        Renderable(
-            lambda brush: brush.draw_image(corner_sprite+"_br.png"),
-            0
-        ),
-        TilePositionable("wall", (w_max, h_max), -10)
-    )
-
-    # walls
-    for i in range(2, w_max):
-        t = world.entity()
-        t.add_components(
-            Positionable(0, 0, w, 2*h),
-            Renderable(
-                lambda brush: brush.draw_image(wall_sprite+"_t.png"),
-                0
-            ),
-            TilePositionable("wall", (i, 1), -10)
-        )
-        b = world.entity()
-        b.add_components(
-            Positionable(0, 0, w, 2*h),
-            Renderable(
-                lambda brush: brush.draw_image(wall_sprite+"_b.png"),
-                0
-            ),
-            TilePositionable("wall", (i, h_max), -10)
+    for suffix, pos in [
+            ("_tl.png", (0, 1)),
+            ("_tr.png", (w_max, 1)),
+            ("_bl.png", (0, h_max)),
+            ("_br.png", (w_max, h_max))
+    ]:
+        create_tiles(
+            world,
+            "wall",
+            corner_sprite + suffix,
+            (2*w, 2*h),
+            -10,
+            [pos]
         )
 
-    for j in range(2, h_max):
-        l = world.entity()
-        l.add_components(
-            Positionable(0, 0, 2*w, h),
-            Renderable(
-                lambda brush: brush.draw_image(wall_sprite+"_l.png"),
-                0
-            ),
-            TilePositionable("wall", (0, j), -10)
-        )
-        r = world.entity()
-        r.add_components(
-            Positionable(0, 0, 2*w, h),
-            Renderable(
-                lambda brush: brush.draw_image(wall_sprite+"_r.png"),
-                0
-            ),
-            TilePositionable("wall", (w_max, j), -10)
+    # walls
+    for suffix, size, positions in [
+            ("_t.png", (w, 2*h), [(i, 1) for i in range(2, w_max)]),
+            ("_b.png", (w, 2*h), [(i, h_max) for i in range(2, w_max)]),
+            ("_l.png", (2*w, h), [(0, j) for j in range(2, h_max)]),
+            ("_r.png", (2*w, h), [(w_max, j) for j in range(2, h_max)])
+    ]:
+        create_tiles(
+            world,
+            "wall",
+            wall_sprite + suffix,
+            size,
+            -10,
+            positions
         )
 
     # furniture
     table = world.entity()
     table.add_components(
         Positionable(0, 0, 150, 100),
-        Renderable(
-            lambda brush: brush.draw_image("table_textured.png"),
-            1
-        ),
+        Renderable(None, 1),
+        Sprite("table_textured.png"),
         TilePositionable("ground", (1, 5), 1)
     )
+    table.add_tag(Static)
 
     stool_animable = Animable()
     stool_toggled = [False]
@@ -176,10 +161,8 @@ def create_room(
     stool = world.entity()
     stool.add_components(
         Positionable(0, 0, 40, 40),
-        Renderable(
-            lambda brush: brush.draw_image("stool.png"),
-            1
-        ),
+        Renderable(None, 1),
+        Sprite("stool.png"),
         TilePositionable("ground", (2, 6), 1),
         stool_animable,
         Clickable(
@@ -187,4 +170,5 @@ def create_room(
             Button.LEFT
         )
     )
+    stool.add_tag(Static)
     add_cursor_change_hoverable(stool)
@@ -16,7 +16,7 @@
 
 from animation import Animable, VanishAnimation
 from ecs import Activable
-from graphics import Renderable
+from graphics import Renderable, Sprite
 from light import Lightable
 from tile import TilePositionable
 from geometry import Positionable
@@ -89,7 +89,11 @@ class Step:
         if renderable is None:
             raise "Entity must be renderable"
 
-        renderable.render_image(image)
+        sprite = entity.get_component(Sprite)
+        if sprite is not None:
+            sprite.key = image
+        else:
+            renderable.render_image(image)
 
     def toggle_light(self, entity, bool=True):
         """ Toggle or untoggle light
@@ -24,7 +24,8 @@ duration = 15
 
 
 class Sky:
-    pass
+    """Tag of the sky entity. It is added with Entity.add_tag.
+    """
 
 
 class SkyHelper:
@@ -53,8 +54,8 @@ def create_sky_effect(world, pos, size, layer):
             lambda brush, color: brush.draw_rect(color, (0, 0), size),
             layer
         ),
-        Animable(),
-        Sky()
+        Animable()
     )
+    sky.add_tag(Sky)
 
     return SkyHelper(sky)
@@ -17,6 +17,29 @@
 import pygame
 from data import filepath
 
+# Decoded sounds indexed by data file name. They are shared by every
+# SoundSystem, so each file is decoded once.
+sounds = {}
+
+
+def load_sound(filename):
+    """Return the pygame sound of a data file, decoding it only the
+    first time.
+    """
+    sound = sounds.get(filename)
+
+    if sound is None:
+        sound = pygame.mixer.Sound(filepath(filename))
+        sounds[filename] = sound
+
+    return sound
+
+def clear_cache():
+    """Forget the decoded sounds, which are not valid anymore after
+    pygame.quit.
+    """
+    sounds.clear()
+
 
 class SoundSystem:
     """In charge of handling sounds.
@@ -26,12 +49,11 @@ class SoundSystem:
         """Initialization
 
         configuration is a dictionary associating a sound name to its file.
+        Files already decoded, see prefetch, are not decoded again.
         """
         self.sounds = {}
         for pair in configuration.iteritems():
-            self.sounds[pair[0]] = pygame.mixer.Sound(
-                filepath(pair[1])
-            )
+            self.sounds[pair[0]] = load_sound(pair[1])
 
     def play(self, name):
         """Play the sound associated to name.
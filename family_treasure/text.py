@@ -18,6 +18,7 @@ import pygame
 from graphics import Colorable, Renderable
 from mouse import Hoverable
 from geometry import Positionable
+from fonts import get_text_size
 
 def create_text_entity(
         world,
@@ -68,14 +69,8 @@ def create_hoverable_text_entity(
 
 def get_text_positionable(text, font_size, x=0, y=0, font_type=None):
     """ Use pygame to compute the width and height of a text entity """
-    font = pygame.font.Font(font_type, font_size)
-    pygame_rect = font.render(text, False, (255, 0, 0)).get_rect().move(x, y)
-    return Positionable(
-        pygame_rect.left,
-        pygame_rect.top,
-        pygame_rect.width, 
-        pygame_rect.height
-    )
+    width, height = get_text_size(text, font_size, font_type)
+    return Positionable(x, y, width, height)
 
 def center_horizontally(entity):
     entity.get_component(Positionable).center_horizontally()
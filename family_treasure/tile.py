@@ -15,8 +15,13 @@
 # <http://www.gnu.org/licenses/>.
 
 from math import floor
+
+import pygame
+
 from geometry import Positionable
 from graphics import Renderable
+from ecs import mark_changed, current_change
+from columns import ColumnStore, numpy
 
 
 class TileSpace(object):
@@ -26,7 +31,7 @@ class TileSpace(object):
     a grid at a macro-level (ex: 1 unit ~= 1 meter)
     """
 
-    def __init__(self, name, ratio):
+    def __init__(self, name, ratio, clip=None):
         """Initialization
 
         The name is used to refer to this tile space.
@@ -35,13 +40,22 @@ class TileSpace(object):
         of 2 means 2 pixels for 1 unit. The ratio may not be the same
         for x and y, so it is a tuple (ratio_x, ratio_y)
 
+        The clip is an optional (x, y, width, height) rectangle of the
+        screen: the entities of the tile space are not drawn when they
+        are outside of it, see Renderable.visible_area.
         """
         self.name = name
         self.ratio = ratio
+        self.clip = None
+        if clip is not None:
+            self.clip = pygame.Rect(clip)
 
 
 class TilePositionable(object):
     """Component for entities that have a position in a tile system.
+
+    Changes are stamped with ecs.mark_changed. The position and layer
+    can be bound to a columns.ColumnStore, see TileSystem.
     """
 
     def __init__(self, tile_space_name, pos, layer):
@@ -52,40 +66,162 @@ class TilePositionable(object):
         layer : On the same cell, a higher layer will be drawn on the top
         """
         self.tile_space_name = tile_space_name
-        self.pos = pos
-        self.layer = layer
+        self._pos = pos
+        self._layer = layer
+        self.store = None
+        self.slot = None
+        mark_changed(self)
+
+    def bind(self, store, slot, space_index):
+        """Move the position to a slot of a column store.
+
+        space_index is the index of the tile space in the store.
+        """
+        store.set("tile_x", slot, self._pos[0])
+        store.set("tile_y", slot, self._pos[1])
+        store.set("tile_layer", slot, self._layer)
+        store.set("space", slot, space_index)
+        self.store = store
+        self.slot = slot
+
+    def unbind(self):
+        """Move the position back from the column store to the component.
+        """
+        self._pos = self.pos
+        self._layer = self.layer
+        self.store = None
+        self.slot = None
+
+    @property
+    def pos(self):
+        if self.store is None:
+            return self._pos
+        return (
+            self.store.get("tile_x", self.slot),
+            self.store.get("tile_y", self.slot)
+        )
+
+    @pos.setter
+    def pos(self, pos):
+        if self.store is None:
+            self._pos = pos
+        else:
+            self.store.set("tile_x", self.slot, pos[0])
+            self.store.set("tile_y", self.slot, pos[1])
+        mark_changed(self)
 
     @property
     def x(self):
-        return self.pos[0]
+        if self.store is None:
+            return self._pos[0]
+        return self.store.get("tile_x", self.slot)
 
     @x.setter
     def x(self, x):
-        self.pos = (x, self.pos[1])
+        if self.store is None:
+            self._pos = (x, self._pos[1])
+        else:
+            self.store.set("tile_x", self.slot, x)
+        mark_changed(self)
 
     @property
     def y(self):
-        return self.pos[1]
+        if self.store is None:
+            return self._pos[1]
+        return self.store.get("tile_y", self.slot)
 
     @y.setter
     def y(self, y):
-        self.pos = (self.pos[0], y)
+        if self.store is None:
+            self._pos = (self._pos[0], y)
+        else:
+            self.store.set("tile_y", self.slot, y)
+        mark_changed(self)
+
+    @property
+    def layer(self):
+        if self.store is None:
+            return self._layer
+        return self.store.get("tile_layer", self.slot)
+
+    @layer.setter
+    def layer(self, layer):
+        if self.store is None:
+            self._layer = layer
+        else:
+            self.store.set("tile_layer", self.slot, layer)
+        mark_changed(self)
 
 
 class TileSystem(object):
     """System in charge of updating on-screen position of tile objects.
+
+    In columnar mode, the TilePositionable, Positionable and Renderable
+    components of the tile entities are bound to a column store, and
+    their screen positions and layers are computed in one vectorized
+    pass. This mode requires NumPy.
+
+    Otherwise, only the entities whose TilePositionable changed since
+    the last update are updated, unless tile spaces or the set of tile
+    entities changed.
     """
 
-    def __init__(self, world, layers_per_cell):
+    # Component classes accessed by the system, see pipeline.SystemPipeline
+    reads = (TileSpace, TilePositionable, Positionable)
+    writes = (Positionable, Renderable)
+
+    def __init__(self, world, layers_per_cell, columnar=False):
         self.world = world
         self.layers_per_cell = layers_per_cell
+        self.tile_spaces = world.query(Positionable, TileSpace)
+        self.tile_entities = world.query(
+            Positionable,
+            Renderable,
+            TilePositionable
+        )
+        self.last_change = 0
+        self.updated_entities = None
+        self.updated_spaces = None
+
+        self.store = None
+        if columnar:
+            self.store = ColumnStore([
+                ("tile_x", "float64"),
+                ("tile_y", "float64"),
+                ("tile_layer", "float64"),
+                ("space", "intp"),
+                ("x", "int32"),
+                ("y", "int32"),
+                ("height", "int32"),
+                ("layer", "float64")
+            ])
+            self.space_indices = {}
+            self.bound_slots = {}
+            self.slot_entities = {}
+            self.bound_entities = None
 
     def update_tile_positions(self):
         """Update Positionable and Renderable entities with tile information.
         """
+        since = self.last_change
+        self.last_change = current_change()
         tile_spaces = self.get_tile_spaces()
+
+        if self.store is not None:
+            self.update_columns(tile_spaces)
+            return
+
         tile_entities = self.get_tile_positionable_entities()
 
+        if (tile_entities is not self.updated_entities
+                or self.have_tile_spaces_changed(since)):
+            self.updated_entities = tile_entities
+        else:
+            tile_entities = self.tile_entities.changed_since(
+                TilePositionable,
+                since
+            )
+
         for entity in tile_entities:
             tile_component = entity.get_component(TilePositionable)
             self.update_entity(
@@ -107,27 +243,137 @@ class TileSystem(object):
 
         cell_layer = tile_component.y * self.layers_per_cell
         renderable.layer = cell_layer + tile_component.layer
+        renderable.visible_area = tile_space["clip"]
+
+    def update_columns(self, tile_spaces):
+        """Update all the bound entities' coordinates in one pass.
+        """
+        spaces = self.tile_spaces.get_entities()
+        if self.bind_entities() or spaces is not self.updated_spaces:
+            self.updated_spaces = spaces
+            self.update_visible_areas(tile_spaces)
+
+        count = len(self.space_indices)
+        origin_x = numpy.zeros(count)
+        origin_y = numpy.zeros(count)
+        ratio_x = numpy.zeros(count)
+        ratio_y = numpy.zeros(count)
+        for name, index in self.space_indices.iteritems():
+            tile_space = tile_spaces.get(name)
+            if tile_space is not None:
+                origin_x[index] = tile_space["x"]
+                origin_y[index] = tile_space["y"]
+                ratio_x[index] = tile_space["ratio"][0]
+                ratio_y[index] = tile_space["ratio"][1]
+
+        store = self.store
+        space = store.view("space")
+        tile_y = store.view("tile_y")
+        x = origin_x[space] + store.view("tile_x") * ratio_x[space]
+        y = origin_y[space] + tile_y * ratio_y[space] - store.view("height")
+        layer = tile_y * self.layers_per_cell + store.view("tile_layer")
+
+        # Columns are compared after the integer truncation of positions
+        x = x.astype(store.view("x").dtype)
+        y = y.astype(store.view("y").dtype)
+        moved = (x != store.view("x")) | (y != store.view("y"))
+        relayered = layer != store.view("layer")
+        store.view("x")[:] = x
+        store.view("y")[:] = y
+        store.view("layer")[:] = layer
+
+        for slot in numpy.flatnonzero(moved | relayered):
+            entity = self.slot_entities.get(slot)
+            if entity is not None:
+                if moved[slot]:
+                    mark_changed(entity.get_component(Positionable))
+                if relayered[slot]:
+                    mark_changed(entity.get_component(Renderable))
+
+    def update_visible_areas(self, tile_spaces):
+        """Set the visible area of the bound entities to the clip of
+        their tile space.
+        """
+        for entity in self.bound_slots:
+            tile_component = entity.get_component(TilePositionable)
+            tile_space = tile_spaces.get(tile_component.tile_space_name)
+            renderable = entity.get_component(Renderable)
+            if tile_space is None:
+                renderable.visible_area = None
+            else:
+                renderable.visible_area = tile_space["clip"]
+
+    def bind_entities(self):
+        """Bind the new tile entities to the column store, and unbind
+        the ones that are gone.
+
+        Return True if some entities were bound or unbound.
+        """
+        entities = self.get_tile_positionable_entities()
+        if entities is self.bound_entities:
+            return False
+
+        current = set(entities)
+        for entity in self.bound_slots.keys():
+            if entity not in current:
+                self.unbind_entity(entity)
+
+        for entity in entities:
+            if entity not in self.bound_slots:
+                self.bind_entity(entity)
+
+        self.bound_entities = entities
+        return True
+
+    def bind_entity(self, entity):
+        tile_component = entity.get_component(TilePositionable)
+        name = tile_component.tile_space_name
+        if name not in self.space_indices:
+            self.space_indices[name] = len(self.space_indices)
+
+        slot = self.store.allocate()
+        tile_component.bind(self.store, slot, self.space_indices[name])
+        entity.get_component(Positionable).bind(self.store, slot)
+        entity.get_component(Renderable).bind(self.store, slot)
+        self.bound_slots[entity] = slot
+        self.slot_entities[slot] = entity
+
+    def unbind_entity(self, entity):
+        entity.get_component(TilePositionable).unbind()
+        entity.get_component(Positionable).unbind()
+        entity.get_component(Renderable).unbind()
+        slot = self.bound_slots.pop(entity)
+        del self.slot_entities[slot]
+        self.store.free(slot)
+
+    def have_tile_spaces_changed(self, since):
+        """Return True if a tile space has been added, removed or moved
+        since the change stamp.
+        """
+        tile_spaces = self.tile_spaces.get_entities()
+        if tile_spaces is not self.updated_spaces:
+            self.updated_spaces = tile_spaces
+            return True
+
+        return bool(self.tile_spaces.changed_since(Positionable, since))
 
     def get_tile_spaces(self):
         """Return a dictionary whose keys are space names, and values are
-        tile space data (x, y, and ratio).
+        tile space data (x, y, ratio and clip).
         """
         spaces = {}
-        for entity in self.world.get_entities([Positionable, TileSpace]):
+        for entity in self.tile_spaces:
             component = entity.get_component(TileSpace)
             position = entity.get_component(Positionable)
             spaces[component.name] = {
                 "x": position.x,
                 "y": position.y,
-                "ratio": component.ratio
+                "ratio": component.ratio,
+                "clip": component.clip
             }
         return spaces
 
     def get_tile_positionable_entities(self):
         """Return a list of the entities wich can be updated.
         """
-        return self.world.get_entities([
-            Positionable,
-            Renderable,
-            TilePositionable
-        ])
+        return self.tile_entities.get_entities()
@@ -19,8 +19,13 @@ from text import create_text_entity, create_hoverable_text_entity,\
 from mouse import Clickable, Button
 from game_screen import transition as gamescreen_transition
 from data import filepath
+from prefetch import uses_assets
 
 
+@uses_assets(fonts=[
+    (filepath("bilbo/BilboSwashCaps-Regular.otf"), 70),
+    (filepath("bilbo/Bilbo-Regular.otf"), 40)
+])
 def create_title_screen(world, scheduler, end_game):
     from ingame_screen import create_ingame_screen
 